@@ -7,7 +7,6 @@
 """
 import asyncio
 import signal
-import sys
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
@@ -29,7 +28,8 @@ async def run_zlib_update_job():
     """运行 zlib 更新任务"""
     try:
         logger.info("开始运行 zlib 更新任务")
-        success = update_zlib_links(should_update_db=True)
+        # 同步的网络请求与数据库写入放到线程中执行，避免阻塞调度器所在的事件循环
+        success = await asyncio.to_thread(update_zlib_links, should_update_db=True)
         if success:
             logger.success("zlib 更新任务完成")
         else:
@@ -76,6 +76,8 @@ async def main():
         id='zlib_update_job',
         name='ZLib 更新任务',
         max_instances=1,  # 防止任务重叠
+        coalesce=True,  # 错过的多次触发合并为一次
+        misfire_grace_time=1800,
         replace_existing=True,
     )
 
@@ -94,26 +96,21 @@ async def main():
     logger.info("首次运行 zlib 更新任务")
     await run_zlib_update_job_with_scheduler(scheduler)
 
-    # 设置优雅关闭
-    def shutdown_handler(signum, frame):
-        logger.info("接收到关闭信号，正在停止调度器...")
-        scheduler.shutdown()
-        sys.exit(0)
-
-    signal.signal(signal.SIGINT, shutdown_handler)
-    signal.signal(signal.SIGTERM, shutdown_handler)
+    # 设置优雅关闭：信号只负责唤醒主协程，空闲期间不再轮询
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
 
     try:
         # 保持程序运行
-        while True:
-            await asyncio.sleep(1)
-    except KeyboardInterrupt:
-        logger.info("收到键盘中断信号，正在停止调度器...")
-        scheduler.shutdown()
+        await stop_event.wait()
+        logger.info("接收到关闭信号，正在停止调度器...")
     except Exception as e:
         logger.error(f"程序运行时发生错误: {e}")
-        scheduler.shutdown()
         raise
+    finally:
+        scheduler.shutdown(wait=False)
 
 
 if __name__ == '__main__':
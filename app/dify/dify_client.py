@@ -5,12 +5,17 @@
 @GitHub  : https://github.com/QIN2DIM
 @Desc    :
 """
+import asyncio
 import json
 import mimetypes
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Any, AsyncGenerator, Dict
+from typing import List, Any, AsyncGenerator, Dict, Tuple
 
-from httpx import AsyncClient
+from httpx import AsyncClient, Limits
 from httpx_sse import aconnect_sse
 from loguru import logger
 from pydantic import ValidationError
@@ -28,15 +33,52 @@ from dify.models import (
 )
 from settings import settings
 
+# 单次请求内并发上传文件的上限，避免触发 Dify 的速率限制
+UPLOAD_CONCURRENCY = 8
+
+# 进程级复用的文件读取线程池，不与默认执行器中的其他阻塞任务争抢线程
+_io_pool = ThreadPoolExecutor(
+    max_workers=min(32, (os.cpu_count() or 1) * 4), thread_name_prefix="dify-io"
+)
+
+# info/parameters/meta 返回的应用配置很少变化，缓存 10 分钟
+APP_CONFIG_TTL = 600
+
+_AUTH_HEADERS = {"Authorization": f"Bearer {settings.DIFY_WORKFLOW_API_KEY.get_secret_value()}"}
+
+
+# 最常见的上传类型，直接命中，无需初始化 mimetypes 数据库
+_IMAGE_MIME_TYPES = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".webp": "image/webp",
+}
+
+
+@lru_cache(maxsize=64)
+def _guess_mime_type(suffix: str) -> str:
+    mime_type, _ = mimetypes.guess_type(f"file{suffix}")
+    return mime_type or "application/octet-stream"
+
 
 class DifyWorkflowClient:
     def __init__(
         self,
-        api_key: str = settings.DIFY_WORKFLOW_API_KEY.get_secret_value(),
+        api_key: str | None = None,
         base_url: str = settings.DIFY_APP_BASE_URL,
     ):
-        headers = {"Authorization": f"Bearer {api_key}"}
-        self._client = AsyncClient(base_url=base_url, headers=headers, timeout=900)
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else _AUTH_HEADERS
+        limits = Limits(max_keepalive_connections=20, max_connections=100, keepalive_expiry=60)
+        # HTTP/2 让并发的上传与 workflow 请求复用同一条 TLS 连接（h2 由 python-telegram-bot[all] 引入）
+        self._client = AsyncClient(
+            base_url=base_url, headers=headers, timeout=900, limits=limits, http2=True
+        )
+        self._app_config_cache: Dict[str, tuple[float, Any]] = {}
+
+    async def aclose(self):
+        """关闭底层连接池"""
+        await self._client.aclose()
 
     async def _fmt_payload(
         self,
@@ -133,18 +175,20 @@ class DifyWorkflowClient:
                     if isinstance(file_path, Path) and file_path.is_file():
                         files_to_upload.append((file_path, _filter_type))
 
-            # Upload all files
-            for file_path, file_type in files_to_upload:
-                try:
-                    if fs := await self.upload_files(
-                        payload.user_id, file_path, filter_type=file_type
-                    ):
-                        fs_body = WorkflowFileInputBody(
-                            type=file_type, transfer_method="local_file", upload_file_id=fs.id
-                        )
-                        _payload_files.append(fs_body)
-                except Exception as e:
-                    logger.error(f"Failed to upload file {file_path}: {e}")
+            results = await self.upload_files_bulk(payload.user_id, files_to_upload)
+
+            for (file_path, file_type), fs in zip(files_to_upload, results):
+                # gather(return_exceptions=True) 会把 CancelledError 当作结果返回，需继续向上传播取消
+                if isinstance(fs, asyncio.CancelledError):
+                    raise fs
+                if isinstance(fs, BaseException):
+                    logger.error(f"Failed to upload file {file_path}: {fs}")
+                    continue
+                if fs:
+                    fs_body = WorkflowFileInputBody.model_construct(
+                        type=file_type, transfer_method="local_file", upload_file_id=fs.id
+                    )
+                    _payload_files.append(fs_body)
 
         if _payload_files:
             payload.inputs.files = _payload_files
@@ -175,8 +219,8 @@ class DifyWorkflowClient:
         if payload.response_mode == "blocking":
             response = await self._client.post("/workflows/run", json=payload_json)
             response.raise_for_status()
-            result = response.json()
-            return WorkflowCompletionResponse(**result)
+            # 直接由 pydantic-core 解析原始字节，省去中间 dict 的构造
+            return WorkflowCompletionResponse.model_validate_json(response.content)
 
         return None
 
@@ -205,6 +249,8 @@ class DifyWorkflowClient:
         async with aconnect_sse(
             self._client, "POST", "/workflows/run", json=payload_json
         ) as event_source:
+            # 出错时 Dify 返回的是普通 JSON 响应，先检查状态码再按 SSE 逐行读取
+            event_source.response.raise_for_status()
             async for sse in event_source.aiter_sse():
                 # 检查 sse.data 是否为空或只是空白字符
                 if not sse.data or not sse.data.strip():
@@ -232,6 +278,32 @@ class DifyWorkflowClient:
         response = await self._client.post(f"/workflows/tasks/{task_id}/stop", json=payload)
         response.raise_for_status()
 
+    async def upload_files_bulk(
+        self, user_id: str, files: List[Tuple[Path, FILE_TYPE]]
+    ) -> List[FilesUploadResponse | None | BaseException]:
+        """
+        批量上传文件
+
+        Dify `/files/upload` 每次请求只接受一个文件，因此这里在同一条 HTTP/2 连接上并发多路复用，
+        以 UPLOAD_CONCURRENCY 限制并发数。返回结果与输入顺序一致，单个文件失败时对应位置为异常对象。
+        Args:
+            user_id: 用户标识，必须和发送消息接口传入 user 保持一致
+            files: (文件路径, 文件类型) 列表
+
+        Returns:
+
+        """
+        semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+
+        async def _upload(file_path: Path, file_type: FILE_TYPE):
+            async with semaphore:
+                return await self.upload_files(user_id, file_path, filter_type=file_type)
+
+        return await asyncio.gather(
+            *[_upload(file_path, file_type) for file_path, file_type in files],
+            return_exceptions=True,
+        )
+
     async def upload_files(
         self, user_id: str, file_path: Path, filter_type: FILE_TYPE = "image"
     ) -> FilesUploadResponse | None:
@@ -269,19 +341,19 @@ class DifyWorkflowClient:
 
         # For "custom" type, allow any file
 
-        mime_type, _ = mimetypes.guess_type(file_path)
-        if mime_type is None:
-            mime_type = 'application/octet-stream'
+        suffix = file_path.suffix.lower()
+        mime_type = _IMAGE_MIME_TYPES.get(suffix) or _guess_mime_type(suffix)
 
-        file_bytes = file_path.read_bytes()
+        # 在专用线程池中读取文件，避免大文件阻塞事件循环
+        loop = asyncio.get_running_loop()
+        file_bytes = await loop.run_in_executor(_io_pool, file_path.read_bytes)
         data = {"user": user_id}
         files = {"file": (file_path.name, file_bytes, mime_type)}
         response = await self._client.post("/files/upload", data=data, files=files)
         response.raise_for_status()
-        result = response.json()
-        logger.debug(f"upload files: {user_id} {file_path.name} ({filter_type})")
+        logger.debug("upload files: {} {} ({})", user_id, file_path.name, filter_type)
 
-        return FilesUploadResponse(**result)
+        return FilesUploadResponse.model_validate_json(response.content)
 
     async def logs(self):
         """
@@ -293,11 +365,26 @@ class DifyWorkflowClient:
         response = await self._client.get("/workflows/logs", params=params)
         response.raise_for_status()
 
+    async def _get_app_config(self, endpoint: str):
+        """读取应用级静态配置，结果在 APP_CONFIG_TTL 秒内复用"""
+        if cached := self._app_config_cache.get(endpoint):
+            expires_at, data = cached
+            if time.monotonic() < expires_at:
+                return data
+
+        response = await self._client.get(endpoint)
+        response.raise_for_status()
+        data = response.json()
+        self._app_config_cache[endpoint] = (time.monotonic() + APP_CONFIG_TTL, data)
+        return data
+
+    def invalidate_app_config(self):
+        """清空 info/parameters/meta 的缓存，应用配置变更后调用"""
+        self._app_config_cache.clear()
+
     async def info(self):
         """获取应用基本信息"""
-        response = await self._client.get("/info")
-        response.raise_for_status()
-        return response.json()
+        return await self._get_app_config("/info")
 
     async def parameters(self):
         """
@@ -307,9 +394,7 @@ class DifyWorkflowClient:
         Returns:
 
         """
-        response = await self._client.get("/parameters")
-        response.raise_for_status()
-        return response.json()
+        return await self._get_app_config("/parameters")
 
     async def meta(self):
         """
@@ -318,6 +403,4 @@ class DifyWorkflowClient:
         Returns:
 
         """
-        response = await self._client.get("/meta")
-        response.raise_for_status()
-        return response.json()
+        return await self._get_app_config("/meta")
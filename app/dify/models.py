@@ -8,9 +8,9 @@
 from decimal import Decimal
 from enum import Enum, StrEnum
 from typing import Any, Dict, List, Optional, Union
-from typing import Type, Literal
+from typing import Literal
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from pydantic import Field
 from telegram import User
 
@@ -40,31 +40,33 @@ FORCED_COMMAND_TYPE = Union[
     str, ForcedCommand, Literal["Any", "CommitMessageGeneration", "AutoTranslation", "Test"]
 ]
 
-ALLOWED_FILE_DOCS = [
-    "TXT",
-    "MD",
-    "MDX",
-    "MARKDOWN",
-    "PDF",
-    "HTML",
-    "XLSX",
-    "XLS",
-    "DOC",
-    "DOCX",
-    "csv",
-    "EML",
-    "MSG",
-    "PPTX",
-    "PPT",
-    "XML",
-    "EPUB",
-]
-
-ALLOWED_FILE_IMAGE = ["JPG", "JPEG", "PNG", "WEBP"]
-
-ALLOWED_FILE_AUDIO = ["MP3", "M4A", "WAV", "AMR", "MPGA"]
-
-ALLOWED_FILE_VIDEO = ["MP4", "MOV", "MPEG", "WEBM"]
+ALLOWED_FILE_DOCS = frozenset(
+    {
+        "TXT",
+        "MD",
+        "MDX",
+        "MARKDOWN",
+        "PDF",
+        "HTML",
+        "XLSX",
+        "XLS",
+        "DOC",
+        "DOCX",
+        "CSV",
+        "EML",
+        "MSG",
+        "PPTX",
+        "PPT",
+        "XML",
+        "EPUB",
+    }
+)
+
+ALLOWED_FILE_IMAGE = frozenset({"JPG", "JPEG", "PNG", "WEBP"})
+
+ALLOWED_FILE_AUDIO = frozenset({"MP3", "M4A", "WAV", "AMR", "MPGA"})
+
+ALLOWED_FILE_VIDEO = frozenset({"MP4", "MOV", "MPEG", "WEBM"})
 
 
 class WorkflowFileInputBody(BaseModel):
@@ -83,16 +85,19 @@ class WorkflowInputs(BaseModel):
 
 
 class WorkflowRunPayload(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     inputs: WorkflowInputs
-    user: Type[User] | str
+    user: User | str
     response_mode: Literal["streaming", "blocking"] = "streaming"
 
     @property
     def user_id(self) -> str:
-        return self.user.id if isinstance(self.user, User) else self.user
+        return str(getattr(self.user, "id", self.user))
 
     def dumps_params(self) -> dict:
-        _payload = self.model_dump(mode="json")
+        # `user` 总会被 user_id 覆盖，无需参与序列化
+        _payload = self.model_dump(mode="json", exclude={"user"})
         _payload["user"] = self.user_id
         return _payload
 
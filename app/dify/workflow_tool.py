@@ -5,6 +5,9 @@
 @GitHub  : https://github.com/QIN2DIM
 @Desc    :
 """
+import asyncio
+import hashlib
+import json
 from pathlib import Path
 from typing import List, Dict
 
@@ -18,6 +21,73 @@ from dify.models import (
 )
 from settings import settings
 
+_client_singleton: DifyWorkflowClient | None = None
+
+# 正在执行中的阻塞式 workflow 请求，同一用户的相同请求复用同一个任务
+_inflight: Dict[str, asyncio.Task] = {}
+
+# 可选：限制同时发往 Dify 的阻塞式 workflow 请求数，未配置 DIFY_CONCURRENCY 时不限流
+_workflow_semaphore: asyncio.Semaphore | None = (
+    asyncio.Semaphore(settings.DIFY_CONCURRENCY) if settings.DIFY_CONCURRENCY else None
+)
+
+
+def get_client() -> DifyWorkflowClient:
+    """获取进程内共享的 DifyWorkflowClient，复用同一个 keep-alive 连接池"""
+    global _client_singleton
+
+    if _client_singleton is None:
+        _client_singleton = DifyWorkflowClient()
+
+    return _client_singleton
+
+
+async def close_client():
+    """释放共享客户端的连接池，在应用关闭时调用"""
+    global _client_singleton
+
+    if _client_singleton is not None:
+        client, _client_singleton = _client_singleton, None
+        await client.aclose()
+
+
+async def _run_workflow(
+    payload: WorkflowRunPayload,
+    with_files: Path | List[Path] | Dict[str, List[Path]] | None = None,
+) -> WorkflowCompletionResponse:
+    """执行阻塞式 workflow；配置了并发上限时，超出上限的请求排队等待"""
+    if _workflow_semaphore is None:
+        return await get_client().run(payload=payload, with_files=with_files)
+
+    async with _workflow_semaphore:
+        return await get_client().run(payload=payload, with_files=with_files)
+
+
+def _inflight_key(
+    from_user: str,
+    message_context: str,
+    bot_username: str,
+    forced_command: FORCED_COMMAND_TYPE | None,
+    with_files: Path | List[Path] | Dict[str, List[Path]] | None,
+) -> str:
+    """
+    阻塞式请求的去重键
+
+    from_user（即 payload.user，含用户 id）是键的一部分，不同用户发送的相同内容各自调用 Dify；
+    各字段序列化为 JSON 数组后再哈希，字段内容中的分隔符不会造成键冲突
+    """
+    if isinstance(with_files, dict):
+        files = sorted(str(p) for paths in with_files.values() if paths for p in paths)
+    elif isinstance(with_files, list):
+        files = sorted(str(p) for p in with_files)
+    else:
+        files = [str(with_files)] if with_files else []
+
+    raw = json.dumps(
+        [from_user, bot_username, str(forced_command), message_context, files], ensure_ascii=False
+    )
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
 
 async def run_blocking_dify_workflow(
     message_context: str,
@@ -36,17 +106,27 @@ async def run_blocking_dify_workflow(
     ]:
         forced_command = ForcedCommand.TEST
 
-    client = DifyWorkflowClient()
+    # 并发到达的相同请求（如重复投递）直接等待已有的结果，不再重复调用 Dify
+    key = _inflight_key(from_user, message_context, bot_username, forced_command, with_files)
+    if pending := _inflight.get(key):
+        return await asyncio.shield(pending)
 
-    inputs = WorkflowInputs(
+    # 载荷由本地可信数据构造，使用 model_construct 跳过 pydantic 校验
+    inputs = WorkflowInputs.model_construct(
         message_context=message_context,
         bot_username=bot_username,
         parse_mode=settings.BOT_ANSWER_PARSE_MODE,
         forced_command=forced_command,
     )
-    payload = WorkflowRunPayload(inputs=inputs, user=from_user, response_mode="blocking")
+    payload = WorkflowRunPayload.model_construct(
+        inputs=inputs, user=from_user, response_mode="blocking"
+    )
+
+    task = asyncio.create_task(_run_workflow(payload, with_files))
+    _inflight[key] = task
+    task.add_done_callback(lambda _: _inflight.pop(key, None))
 
-    return await client.run(payload=payload, with_files=with_files)
+    return await asyncio.shield(task)
 
 
 async def run_streaming_dify_workflow(
@@ -62,14 +142,16 @@ async def run_streaming_dify_workflow(
     ]:
         forced_command = ForcedCommand.TEST
 
-    client = DifyWorkflowClient()
-    inputs = WorkflowInputs(
+    client = get_client()
+    inputs = WorkflowInputs.model_construct(
         bot_username=bot_username,
         message_context=message_context,
         parse_mode=settings.BOT_ANSWER_PARSE_MODE,
         forced_command=forced_command,
     )
-    payload = WorkflowRunPayload(inputs=inputs, user=from_user, response_mode="streaming")
+    payload = WorkflowRunPayload.model_construct(
+        inputs=inputs, user=from_user, response_mode="streaming"
+    )
 
     return client.streaming(payload=payload, with_files=with_files)
 
@@ -5,16 +5,19 @@
 @GitHub  : https://github.com/QIN2DIM
 @Desc    :
 """
-import json
-import signal
-import sys
 from contextlib import suppress
 
 from loguru import logger
 from telegram import Update, BotCommand
 from telegram.ext import CommandHandler, MessageHandler, filters
 
-from mybot.common import cleanup_old_social_downloads, cleanup_old_media
+from dify.workflow_tool import close_client
+from mybot.common import (
+    cleanup_downloads,
+    close_messages_dataset,
+    CLEANUP_RULES,
+    SOCIAL_DOWNLOADS_MAX_AGE_HOURS,
+)
 from mybot.task_manager import wait_for_all_tasks, cancel_all_tasks, get_active_tasks_count
 from mybot.handlers.command_handler import (
     start_command,
@@ -25,8 +28,9 @@ from mybot.handlers.command_handler import (
     imagine_command,
 )
 from mybot.handlers.message_handler import handle_message
+from mybot.services.response_service.answer_parts.image_generation import close_image_client
 from plugins import zlib_access_points
-from settings import settings, LOG_DIR
+from settings import settings, LOG_DIR, DATA_DIR
 from utils import init_log
 
 init_log(
@@ -61,11 +65,44 @@ async def setup_bot_commands(application):
         logger.error(f"设置机器人命令菜单失败: {e}")
 
 
+async def drain_active_tasks(application):
+    """等待后台任务完成，超时则取消剩余任务"""
+    if get_active_tasks_count() == 0:
+        return
+
+    try:
+        completed = await wait_for_all_tasks(timeout=30.0)
+        if not completed:
+            logger.warning("Some tasks did not complete in time, cancelling remaining tasks...")
+            cancel_all_tasks()
+        else:
+            logger.info("All tasks completed successfully")
+    except Exception as e:
+        logger.error(f"Error during graceful shutdown: {e}")
+        cancel_all_tasks()
+
+
+async def release_shared_resources(application):
+    """释放共享的 HTTP 连接池，并写完开发数据集队列"""
+    try:
+        await close_client()
+    except Exception as e:
+        logger.error(f"关闭 Dify 客户端失败: {e}")
+
+    try:
+        await close_image_client()
+    except Exception as e:
+        logger.error(f"关闭图片下载客户端失败: {e}")
+
+    try:
+        await close_messages_dataset()
+    except Exception as e:
+        logger.error(f"写入开发数据集失败: {e}")
+
+
 def main() -> None:
     """Start the bot."""
-    sp = settings.model_dump(mode='json')
-
-    s = json.dumps(sp, indent=2, ensure_ascii=False)
+    s = settings.model_dump_json(indent=2)
     logger.success(f"Loading settings: {s}")
 
     if settings.ENABLE_DEV_MODE:
@@ -78,8 +115,13 @@ def main() -> None:
 
     # 定期清理旧的下载文件（每次重启时都尝试清理）
     with suppress(Exception):
-        cleanup_old_media(max_age_hours=24)  # 清理所有媒体文件
-        cleanup_old_social_downloads(max_age_hours=48)  # 社交媒体文件保留时间稍长
+        # 媒体文件保留 24 小时，社交媒体文件保留时间稍长
+        cleanup_downloads(CLEANUP_RULES, default_max_age_hours=SOCIAL_DOWNLOADS_MAX_AGE_HOURS)
+
+    # 早期版本把含 bot token 的 file_path 持久化到了 data/file_path_cache.*，启动时删除
+    for legacy_cache in DATA_DIR.glob("file_path_cache*"):
+        with suppress(OSError):
+            legacy_cache.unlink()
 
     # Create the Application and pass it your bot's token.
     application = settings.get_default_application()
@@ -90,6 +132,10 @@ def main() -> None:
 
     # 设置机器人命令菜单
     application.post_init = setup_bot_commands
+    # 优雅关闭：run_polling 已通过 loop.add_signal_handler 接管 SIGINT/SIGTERM，
+    # 停止轮询后在同一事件循环内等待后台任务，最后释放 HTTP 连接池
+    application.post_stop = drain_active_tasks
+    application.post_shutdown = release_shared_resources
 
     # on different commands - answer in Telegram
     # Important: In group chats, bots receive ALL commands by default, even those
@@ -110,49 +156,35 @@ def main() -> None:
     application.add_handler(CommandHandler("imagine", imagine_command))
 
     # on non command i.e message - echo the message on Telegram
-    application.add_handler(MessageHandler(filters.ALL & ~filters.COMMAND, handle_message))
-
-    # Setting up a graceful shutdown
-    def shutdown_handler(signum, frame):
-        logger.info("Receiving a shutdown signal that is stopping the scheduler...")
-
-        # Check for active background tasks
-        active_count = get_active_tasks_count()
-        if active_count > 0:
-            logger.info(f"Waiting for {active_count} active tasks to complete...")
-
-            # Try to wait for tasks to complete gracefully
-            import asyncio
-
-            try:
-                # Create new event loop for shutdown if needed
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-
-                # Wait up to 30 seconds for tasks to complete
-                completed = loop.run_until_complete(wait_for_all_tasks(timeout=30.0))
-
-                if not completed:
-                    logger.warning(
-                        "Some tasks did not complete in time, cancelling remaining tasks..."
-                    )
-                    cancel_all_tasks()
-                else:
-                    logger.info("All tasks completed successfully")
-
-                loop.close()
-
-            except Exception as e:
-                logger.error(f"Error during graceful shutdown: {e}")
-                cancel_all_tasks()
-
-        sys.exit(0)
-
-    signal.signal(signal.SIGINT, shutdown_handler)
-    signal.signal(signal.SIGTERM, shutdown_handler)
+    # 只接收用户发送的内容消息，服务消息（入群、置顶等）由 PTB 直接丢弃，不再创建任务；
+    # 贴纸、位置、投票等虽无法下载处理，但作为对机器人的回复时仍会触发 REPLAY
+    message_filter = (
+        (
+            filters.TEXT
+            | filters.CAPTION
+            | filters.PHOTO
+            | filters.Document.ALL
+            | filters.AUDIO
+            | filters.VIDEO
+            | filters.VOICE
+            | filters.VIDEO_NOTE
+            | filters.Sticker.ALL
+            | filters.ANIMATION
+            | filters.LOCATION
+            | filters.VENUE
+            | filters.CONTACT
+            | filters.POLL
+            | filters.Dice.ALL
+            | filters.STORY
+            | filters.GAME
+        )
+        & ~filters.COMMAND
+        & ~filters.StatusUpdate.ALL
+    )
+    application.add_handler(MessageHandler(message_filter, handle_message))
 
     # Run the bot until the user presses Ctrl-C
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    application.run_polling(allowed_updates=Update.ALL_TYPES, timeout=settings.POLLING_TIMEOUT)
 
 
 if __name__ == "__main__":
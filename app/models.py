@@ -5,12 +5,11 @@
 @GitHub  : https://github.com/QIN2DIM
 @Desc    :
 """
+from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
 from typing import List, Dict, Any, Union
 
-from pydantic import BaseModel
-
 
 class TaskType(str, Enum):
     IRRELEVANT = "irrelevant"
@@ -39,7 +38,10 @@ class TaskType(str, Enum):
     """
 
 
-class Interaction(BaseModel):
+@dataclass(slots=True)
+class Interaction:
+    """单次交互的上下文容器，仅在进程内传递，无需 pydantic 校验"""
+
     task_type: TaskType | None = None
     photo_paths: List[Path] | None = None
     from_user_fmt: str | None = None
@@ -67,9 +69,6 @@ class Interaction(BaseModel):
     quote_info: Dict[str, Any] | None = None
     """引用文本信息，包含从外部消息引用的文本内容"""
 
-    class Config:
-        arbitrary_types_allowed = True
-
 
 class AgentStrategy(str, Enum):
     FUNCTION_CALLING = "function_calling"
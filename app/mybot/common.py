@@ -5,24 +5,69 @@
 @GitHub  : https://github.com/QIN2DIM
 @Desc    :
 """
+import asyncio
+import heapq
 import json
 import mimetypes
+import os
 import random
+import shutil
 import time
-import uuid
 from contextlib import suppress
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional, Dict
-from collections import defaultdict
+from typing import List, Optional, Dict, Tuple
+from collections import defaultdict, deque, OrderedDict
 
 from loguru import logger
 from telegram import Message, Bot, Document, Audio, Video, Voice, VideoNote, File
 
-from settings import DATA_DIR
+from settings import DATA_DIR, settings
 
 # Media Group cache to handle grouped messages
-_media_group_cache: Dict[str, List[Message]] = defaultdict(list)
-_cache_cleanup_time = time.time()
+# media_group_id -> {message_id: Message}，按 message_id 去重为 O(1)
+_media_group_cache: Dict[str, Dict[int, Message]] = defaultdict(dict)
+# 媒体组最后一次写入缓存后保留的时间（秒）
+MEDIA_GROUP_CACHE_TTL = 120
+# (最后写入时间, media_group_id) 小顶堆，配合 _media_group_seen 做惰性失效
+_media_group_expiry: List[tuple[float, str]] = []
+_media_group_seen: Dict[str, float] = {}
+
+# Telegram 返回的 file_path 至少 1 小时内有效，缓存 get_file 结果避免重复的 API 往返
+FILE_CACHE_TTL = 3300
+FILE_CACHE_MAXSIZE = 4096
+_file_cache: "OrderedDict[str, tuple[float, File]]" = OrderedDict()
+# 正在查询中的 getFile，按 file_id 复用同一个任务
+_inflight_file_lookups: Dict[str, asyncio.Task] = {}
+# file_unique_id -> 已下载的本地文件；命中且文件仍在时连 getFile 都无需调用
+_downloaded_files: "OrderedDict[str, Path]" = OrderedDict()
+# 正在下载中的文件，按 file_unique_id 复用同一个下载任务
+_inflight_downloads: Dict[str, asyncio.Task] = {}
+# 限制同时进行的 getFile 调用与文件传输数，突发的媒体消息排队执行，避免压垮 Bot API
+_download_semaphore = asyncio.Semaphore(settings.DOWNLOAD_CONCURRENCY)
+
+# 各类媒体的下载目录在导入时创建一次，避免每次下载都执行 mkdir
+DOWNLOAD_DIR = DATA_DIR / "downloads"
+MEDIA_TYPES = ("photos", "documents", "audio", "videos", "voice", "video_notes")
+MEDIA_DOWNLOAD_DIRS: Dict[str, Path] = {
+    media_type: DOWNLOAD_DIR / media_type for media_type in MEDIA_TYPES
+}
+for _media_dir in MEDIA_DOWNLOAD_DIRS.values():
+    _media_dir.mkdir(parents=True, exist_ok=True)
+PHOTO_DOWNLOAD_DIR = MEDIA_DOWNLOAD_DIRS["photos"]
+
+# 运行期清理下载文件的最小间隔（秒），清理在线程中执行
+CLEANUP_INTERVAL = 3600
+_last_cleanup = time.monotonic()
+_cleanup_task: asyncio.Task | None = None
+
+# 开发数据集的后台写入队列，首次调用 storage_messages_dataset 时创建
+DATASET_FLUSH_SIZE = 64
+DATASET_FLUSH_INTERVAL = 0.1
+_dataset_queue: asyncio.Queue | None = None
+_dataset_writer_task: asyncio.Task | None = None
+# 写入队列的结束标记，后台任务收到后写完剩余消息再退出
+_DATASET_STOP = object()
 
 
 def should_ignore_command_in_group(update, context) -> bool:
@@ -39,50 +84,123 @@ def should_ignore_command_in_group(update, context) -> bool:
 
     # In groups, check if command contains bot mention
     bot_username = context.bot.username
-    if bot_username and update.message.text:
-        # If command doesn't contain @botname, ignore it
-        command_part = update.message.text.split()[0] if update.message.text else ""
-        if command_part.startswith("/") and f"@{bot_username}" not in command_part:
-            return True
+    text = update.message.text
+    if not bot_username or not text or not text.startswith("/"):
+        return False
+
+    # If command doesn't contain @botname, ignore it
+    # 只切出第一个词（任意空白分隔），无需拆分整条消息
+    command_part = text.split(None, 1)[0]
+    return mention_token(bot_username) not in command_part
+
 
-    return False
+@lru_cache(maxsize=8)
+def mention_token(bot_username: str) -> str:
+    """机器人的 @mention 标记，按 username 缓存"""
+    return f"@{bot_username}"
 
 
 def storage_messages_dataset(chat_type: str, effective_message: Message) -> None:
-    """仅用于开发测试，程序运行稳定后移除"""
+    """仅用于开发测试，程序运行稳定后移除
 
-    preview_text = json.dumps(effective_message.to_dict(), indent=2, ensure_ascii=False)
+    需开启 ENABLE_MESSAGE_DATASET。消息仅入队，由后台任务批量追加写入
+    `{chat_type}_messages/{YYYY-MM-DD}.ndjson`，不阻塞事件循环
+    """
+    global _dataset_queue, _dataset_writer_task
 
-    fp = DATA_DIR.joinpath(f"{chat_type}_messages/{int(time.time())}.json")
-    fp.parent.mkdir(parents=True, exist_ok=True)
+    if not settings.ENABLE_MESSAGE_DATASET:
+        return
 
-    fp.write_text(preview_text, encoding="utf-8")
-    # logger.debug(f"echo message - {preview_text}")
+    if _dataset_queue is None:
+        _dataset_queue = asyncio.Queue()
+        _dataset_writer_task = asyncio.create_task(_dataset_writer(_dataset_queue))
 
+    _dataset_queue.put_nowait((chat_type, effective_message.to_dict()))
 
-def _cleanup_media_group_cache():
-    """Clean up old entries from media group cache"""
-    global _cache_cleanup_time, _media_group_cache
 
-    current_time = time.time()
-    # Clean up every 5 minutes
-    if current_time - _cache_cleanup_time > 300:
-        # Remove entries older than 2 minutes
-        cutoff_time = current_time - 120
+@lru_cache(maxsize=8)
+def _dataset_dir(chat_type: str) -> Path:
+    dataset_dir = DATA_DIR.joinpath(f"{chat_type}_messages")
+    dataset_dir.mkdir(parents=True, exist_ok=True)
+    return dataset_dir
+
+
+def _flush_dataset(batch: List[tuple[str, dict]]) -> None:
+    grouped: Dict[str, List[str]] = defaultdict(list)
+    for chat_type, data in batch:
+        grouped[chat_type].append(json.dumps(data, ensure_ascii=False))
+
+    today = time.strftime("%Y-%m-%d")
+    for chat_type, lines in grouped.items():
+        fp = _dataset_dir(chat_type).joinpath(f"{today}.ndjson")
+        with fp.open("a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+async def _dataset_writer(queue: asyncio.Queue) -> None:
+    """
+    攒够 DATASET_FLUSH_SIZE 条或等待 DATASET_FLUSH_INTERVAL 秒后一次性落盘
+
+    收到 _DATASET_STOP 后写完已取出的消息并退出
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await queue.get()]
+        deadline = loop.time() + DATASET_FLUSH_INTERVAL
+        while len(batch) < DATASET_FLUSH_SIZE and batch[-1] is not _DATASET_STOP:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        stopping = batch[-1] is _DATASET_STOP
+        if stopping:
+            batch.pop()
+
+        if batch:
+            try:
+                await asyncio.to_thread(_flush_dataset, batch)
+            except Exception as e:
+                logger.error(f"Failed to store messages dataset: {e}")
+
+        if stopping:
+            return
+
 
-        groups_to_remove = []
-        for group_id, messages in _media_group_cache.items():
-            # Check if all messages in the group are old
-            if all(msg.date.timestamp() < cutoff_time for msg in messages):
-                groups_to_remove.append(group_id)
+async def close_messages_dataset(timeout: float = 5.0) -> None:
+    """写完队列中剩余的开发数据集消息并停止后台写入任务，在应用关闭时调用"""
+    global _dataset_queue, _dataset_writer_task
 
-        for group_id in groups_to_remove:
-            del _media_group_cache[group_id]
+    if _dataset_queue is None:
+        return
+
+    queue, task = _dataset_queue, _dataset_writer_task
+    _dataset_queue = _dataset_writer_task = None
+    queue.put_nowait(_DATASET_STOP)
+    try:
+        await asyncio.wait_for(task, timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"Timed out flushing messages dataset, {queue.qsize()} messages dropped")
 
-        _cache_cleanup_time = current_time
 
-        if groups_to_remove:
-            logger.debug(f"Cleaned up {len(groups_to_remove)} old media groups from cache")
+def _cleanup_media_group_cache():
+    """Clean up old entries from media group cache"""
+    cutoff_time = time.monotonic() - MEDIA_GROUP_CACHE_TTL
+
+    # 只弹出堆顶已过期的记录，未过期时 O(1) 返回；组在入堆后又被写入过时，旧记录直接丢弃
+    removed = 0
+    while _media_group_expiry and _media_group_expiry[0][0] < cutoff_time:
+        seen_at, group_id = heapq.heappop(_media_group_expiry)
+        if _media_group_seen.get(group_id) == seen_at:
+            del _media_group_seen[group_id]
+            _media_group_cache.pop(group_id, None)
+            removed += 1
+
+    if removed:
+        logger.debug(f"Cleaned up {removed} old media groups from cache")
 
 
 def add_message_to_media_group_cache(message: Message):
@@ -93,17 +211,25 @@ def add_message_to_media_group_cache(message: Message):
     _cleanup_media_group_cache()
 
     group_id = message.media_group_id
+    seen_at = time.monotonic()
+    _media_group_seen[group_id] = seen_at
+    heapq.heappush(_media_group_expiry, (seen_at, group_id))
 
     # Check if this message is already in the cache (by message_id)
-    existing_ids = [msg.message_id for msg in _media_group_cache[group_id]]
-    if message.message_id not in existing_ids:
-        _media_group_cache[group_id].append(message)
+    group_messages = _media_group_cache[group_id]
+    if message.message_id not in group_messages:
+        group_messages[message.message_id] = message
         logger.debug(
-            f"Added message_id={message.message_id} to media group {group_id}, total messages: {len(_media_group_cache[group_id])}"
+            "Added message_id={} to media group {}, total messages: {}",
+            message.message_id,
+            group_id,
+            len(group_messages),
         )
     else:
         logger.debug(
-            f"Message_id={message.message_id} already in media group {group_id} cache, skipping"
+            "Message_id={} already in media group {} cache, skipping",
+            message.message_id,
+            group_id,
         )
 
 
@@ -121,28 +247,111 @@ def get_media_group_messages(message: Message) -> List[Message]:
         return [message]  # Single message, not part of a group
 
     group_id = message.media_group_id
-    group_messages = list(_media_group_cache.get(group_id, []))
-
-    # Check if trigger message is already in the cache (by message_id)
-    message_ids = [msg.message_id for msg in group_messages]
-    if message.message_id not in message_ids:
-        group_messages.append(message)
-
-    # Remove duplicates by message_id (keep first occurrence)
-    seen = set()
-    unique_messages = []
-    for msg in group_messages:
-        if msg.message_id not in seen:
-            seen.add(msg.message_id)
-            unique_messages.append(msg)
+    # 缓存已按 message_id 去重；触发消息不在缓存中时补上
+    group_messages = dict(_media_group_cache.get(group_id, {}))
+    group_messages.setdefault(message.message_id, message)
 
     # Sort by message_id to ensure consistent order
-    unique_messages.sort(key=lambda msg: msg.message_id)
+    unique_messages = [group_messages[message_id] for message_id in sorted(group_messages)]
 
     # logger.debug(f"Found {len(unique_messages)} unique messages in media group {group_id}")
     return unique_messages
 
 
+async def get_telegram_file(bot: Bot, file_id: str) -> File:
+    """
+    带 TTL 的 LRU 缓存版 bot.get_file
+
+    file_path（PTB 中为含 bot token 的完整下载 URL）只缓存在进程内，不落盘
+    """
+    if cached := _file_cache.get(file_id):
+        expires_at, file_obj = cached
+        if time.monotonic() < expires_at:
+            _file_cache.move_to_end(file_id)
+            return file_obj
+
+    # 同一 file_id 并发查询时（如同一媒体组的多次触发）只调用一次 getFile
+    task = _inflight_file_lookups.get(file_id)
+    if task is None:
+        task = asyncio.create_task(_resolve_telegram_file(bot, file_id))
+        _inflight_file_lookups[file_id] = task
+        task.add_done_callback(lambda _: _inflight_file_lookups.pop(file_id, None))
+
+    return await asyncio.shield(task)
+
+
+async def _resolve_telegram_file(bot: Bot, file_id: str) -> File:
+    """进程内缓存未命中时调用 getFile，并写入进程内缓存"""
+    async with _download_semaphore:
+        file_obj = await bot.get_file(file_id)
+
+    _file_cache[file_id] = (time.monotonic() + FILE_CACHE_TTL, file_obj)
+    _file_cache.move_to_end(file_id)
+    while len(_file_cache) > FILE_CACHE_MAXSIZE:
+        _file_cache.popitem(last=False)
+
+    return file_obj
+
+
+def _remember_downloaded(file_unique_id: str, local_path: Path) -> None:
+    _downloaded_files[file_unique_id] = local_path
+    _downloaded_files.move_to_end(file_unique_id)
+    while len(_downloaded_files) > FILE_CACHE_MAXSIZE:
+        _downloaded_files.popitem(last=False)
+
+
+def _lookup_downloaded(file_unique_id: str) -> Optional[Path]:
+    """按 file_unique_id 查找已下载的文件，文件已被清理时移除对应记录"""
+    local_path = _downloaded_files.get(file_unique_id)
+    if local_path is None:
+        return None
+    try:
+        # 刷新 mtime，避免刚复用的文件被过期清理删除；文件不存在时抛出 FileNotFoundError
+        os.utime(local_path)
+    except OSError:
+        _downloaded_files.pop(file_unique_id, None)
+        return None
+    _downloaded_files.move_to_end(file_unique_id)
+    logger.debug(f"Reusing downloaded file: {local_path}")
+    return local_path
+
+
+def _is_local_file(file_path: str | None) -> bool:
+    if not file_path:
+        return False
+    try:
+        return Path(file_path).is_file()
+    except (OSError, ValueError):
+        return False
+
+
+async def _fetch_telegram_file(file_obj: File, local_path: Path) -> Path:
+    """
+    先写入同目录下的临时文件，完成后再 os.replace 到目标路径
+
+    目标路径一旦存在就是完整的文件，失败或取消时删除临时文件
+    """
+    tmp_path = local_path.with_name(f".{local_path.name}.{os.urandom(4).hex()}.part")
+    try:
+        # Download file without blocking the event loop:
+        # 本地 Bot API 模式下 file_path 是共享卷上的本地文件，在线程中 copyfile（内核零拷贝）；
+        # 远程模式下取回内容后在线程中一次性写盘
+        async with _download_semaphore:
+            if _is_local_file(file_obj.file_path):
+                await asyncio.to_thread(shutil.copyfile, file_obj.file_path, tmp_path)
+            else:
+                buf = await file_obj.download_as_bytearray()
+                await asyncio.to_thread(tmp_path.write_bytes, buf)
+        os.replace(tmp_path, local_path)
+    except BaseException:
+        with suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+
+    logger.info(f"Downloaded file: {local_path} (size: {file_obj.file_size} bytes)")
+    return local_path
+
+
 async def download_telegram_file(
     bot: Bot, file_obj: File, download_dir: Path, file_extension: Optional[str] = None
 ) -> Optional[Path]:
@@ -159,22 +368,32 @@ async def download_telegram_file(
         Path to downloaded file or None if failed
     """
     try:
-        # Create download directory if needed
-        download_dir.mkdir(parents=True, exist_ok=True)
-
         # Determine file extension
         if not file_extension and file_obj.file_path:
             file_extension = Path(file_obj.file_path).suffix
         if not file_extension:
             file_extension = '.bin'  # Default binary extension
 
-        # Generate unique filename
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
+        # file_unique_id 对同一文件始终相同，以其命名即可跳过重复下载（如反复转发的同一张图片）
+        unique_filename = f"{file_obj.file_unique_id}{file_extension}"
         local_path = download_dir / unique_filename
-
-        # Download file
-        await file_obj.download_to_drive(local_path)
-        logger.info(f"Downloaded file: {local_path} (size: {file_obj.file_size} bytes)")
+        if local_path.is_file():
+            # 刷新 mtime，避免刚复用的文件被过期清理删除
+            local_path.touch()
+            _remember_downloaded(file_obj.file_unique_id, local_path)
+            logger.debug(f"Reusing downloaded file: {local_path}")
+            return local_path
+
+        # 同一文件正在下载时（如同时转发到多个会话）直接等待已有任务，不再重复传输
+        file_unique_id = file_obj.file_unique_id
+        task = _inflight_downloads.get(file_unique_id)
+        if task is None:
+            task = asyncio.create_task(_fetch_telegram_file(file_obj, local_path))
+            _inflight_downloads[file_unique_id] = task
+            task.add_done_callback(lambda _: _inflight_downloads.pop(file_unique_id, None))
+
+        local_path = await asyncio.shield(task)
+        _remember_downloaded(file_unique_id, local_path)
 
         return local_path
 
@@ -188,7 +407,7 @@ async def _download_photos_from_message(message: Message, bot: Bot) -> List[Path
     从Telegram消息中下载照片到本地
 
     特性：
-    - 自动选择最高质量的图片版本（最大file_size）
+    - 自动选择最高质量的图片版本（最大尺寸）
     - 生成唯一文件名避免冲突
     - 保持原始文件扩展名
     - 错误处理和日志记录
@@ -203,47 +422,104 @@ async def _download_photos_from_message(message: Message, bot: Bot) -> List[Path
     if not message.photo:
         return None
 
-    # 创建下载目录
-    download_dir = DATA_DIR / "downloads" / "photos"
-    download_dir.mkdir(parents=True, exist_ok=True)
-
+    download_dir = PHOTO_DOWNLOAD_DIR
     downloaded_files = []
 
-    # Telegram的photo字段是PhotoSize列表，包含不同尺寸的同一张图片
-    # 我们选择最大尺寸的版本（file_size最大的）
-    largest_photo = max(message.photo, key=lambda x: x.file_size or 0)
+    # Telegram的photo字段是PhotoSize列表，包含不同尺寸的同一张图片，按尺寸升序排列
+    # 最后一项即为最大尺寸的版本
+    largest_photo = message.photo[-1]
 
     logger.debug(
-        f"Downloading photo from message_id={message.message_id}, file_id={largest_photo.file_id}, size={largest_photo.file_size}"
+        "Downloading photo from message_id={}, file_id={}, size={}",
+        message.message_id,
+        largest_photo.file_id,
+        largest_photo.file_size,
     )
 
     try:
-        file_obj = await bot.get_file(largest_photo.file_id)
-        local_path = await download_telegram_file(bot, file_obj, download_dir)
+        local_path = _lookup_downloaded(largest_photo.file_unique_id)
+        if not local_path:
+            file_obj = await get_telegram_file(bot, largest_photo.file_id)
+            local_path = await download_telegram_file(bot, file_obj, download_dir)
         if local_path:
             downloaded_files.append(local_path)
-            logger.debug(f"Successfully downloaded photo to {local_path}")
+            logger.debug("Successfully downloaded photo to {}", local_path)
     except Exception as e:
         logger.error(f"Failed to download photo {largest_photo.file_id}: {e}")
 
     return downloaded_files if downloaded_files else None
 
 
-async def _download_multiple_photos_from_message(message: Message, bot: Bot) -> List[Path] | None:
+# Telegram 媒体常见的 MIME 类型，直接查表；其余类型回退到 mimetypes
+# 注意 mimetypes 会把 audio/ogg 映射为 .oga，不利于后续按扩展名分类
+_MIME_EXT: Dict[str, str] = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+    "video/mp4": ".mp4",
+    "video/quicktime": ".mov",
+    "video/webm": ".webm",
+    "audio/ogg": ".ogg",
+    "audio/mpeg": ".mp3",
+    "audio/mp4": ".m4a",
+    "audio/x-m4a": ".m4a",
+    "audio/wav": ".wav",
+    "audio/x-wav": ".wav",
+    "application/pdf": ".pdf",
+    "text/plain": ".txt",
+}
+
+
+# 导入时加载系统 MIME 表，避免首次回退查询时在事件循环中读取 mime.types
+mimetypes.init()
+
+
+@lru_cache(maxsize=128)
+def _ext_from_mime(mime_type: Optional[str]) -> Optional[str]:
+    if not mime_type:
+        return None
+    return _MIME_EXT.get(mime_type) or mimetypes.guess_extension(mime_type)
+
+
+async def _download_media(
+    bot: Bot,
+    media: Document | Audio | Video | Voice | VideoNote,
+    media_type: str,
+    default_extension: Optional[str] = None,
+) -> Optional[Path]:
     """
-    处理包含多张图片的消息（如果消息包含多个媒体组）
-    注意：单个消息的photo字段只包含一张图片的多个尺寸版本
-    如果要处理真正的多张图片，需要处理media_group_id相同的多条消息
+    Download a single media attachment into its pre-created download directory
+
+    Extension priority: original file name > MIME type > default_extension > Telegram file path
 
     Args:
-        message: Telegram消息对象
-        bot: 机器人对象
+        bot: Bot instance
+        media: Telegram media object (Document, Audio, Video, Voice, VideoNote)
+        media_type: Key of MEDIA_DOWNLOAD_DIRS
+        default_extension: Fallback extension when it cannot be derived from the media itself
 
     Returns:
-        List[Path]: 下载的图片文件路径列表
+        Path to downloaded file or None
     """
-    # 对于单条消息，直接调用单张图片下载函数
-    return await _download_photos_from_message(message, bot)
+    if local_path := _lookup_downloaded(media.file_unique_id):
+        return local_path
+
+    try:
+        file_obj = await get_telegram_file(bot, media.file_id)
+
+        file_name = getattr(media, "file_name", None)
+        if file_name:
+            file_extension = Path(file_name).suffix
+        else:
+            file_extension = _ext_from_mime(getattr(media, "mime_type", None)) or default_extension
+
+        return await download_telegram_file(
+            bot, file_obj, MEDIA_DOWNLOAD_DIRS[media_type], file_extension
+        )
+    except Exception:
+        logger.exception(f"Failed to download {media_type} {media.file_id}")
+        return None
 
 
 async def download_document_from_message(message: Message, bot: Bot) -> Optional[Path]:
@@ -259,26 +535,7 @@ async def download_document_from_message(message: Message, bot: Bot) -> Optional
     """
     if not message.document:
         return None
-
-    download_dir = DATA_DIR / "downloads" / "documents"
-    document: Document = message.document
-
-    try:
-        file_obj = await bot.get_file(document.file_id)
-
-        # Try to determine extension from mime_type or file_name
-        file_extension = None
-        if document.file_name:
-            file_extension = Path(document.file_name).suffix
-        elif document.mime_type:
-            ext = mimetypes.guess_extension(document.mime_type)
-            if ext:
-                file_extension = ext
-
-        return await download_telegram_file(bot, file_obj, download_dir, file_extension)
-    except Exception:
-        logger.exception(f"Failed to download document {document.file_id}")
-        return None
+    return await _download_media(bot, message.document, "documents")
 
 
 async def download_audio_from_message(message: Message, bot: Bot) -> Optional[Path]:
@@ -294,26 +551,7 @@ async def download_audio_from_message(message: Message, bot: Bot) -> Optional[Pa
     """
     if not message.audio:
         return None
-
-    download_dir = DATA_DIR / "downloads" / "audio"
-    audio: Audio = message.audio
-
-    try:
-        file_obj = await bot.get_file(audio.file_id)
-
-        # Determine extension from mime_type
-        file_extension = None
-        if audio.file_name:
-            file_extension = Path(audio.file_name).suffix
-        elif audio.mime_type:
-            ext = mimetypes.guess_extension(audio.mime_type)
-            if ext:
-                file_extension = ext
-
-        return await download_telegram_file(bot, file_obj, download_dir, file_extension)
-    except Exception:
-        logger.exception(f"Failed to download audio {audio.file_id}")
-        return None
+    return await _download_media(bot, message.audio, "audio")
 
 
 async def download_video_from_message(message: Message, bot: Bot) -> Optional[Path]:
@@ -329,26 +567,7 @@ async def download_video_from_message(message: Message, bot: Bot) -> Optional[Pa
     """
     if not message.video:
         return None
-
-    download_dir = DATA_DIR / "downloads" / "videos"
-    video: Video = message.video
-
-    try:
-        file_obj = await bot.get_file(video.file_id)
-
-        # Determine extension from mime_type
-        file_extension = None
-        if video.file_name:
-            file_extension = Path(video.file_name).suffix
-        elif video.mime_type:
-            ext = mimetypes.guess_extension(video.mime_type)
-            if ext:
-                file_extension = ext
-
-        return await download_telegram_file(bot, file_obj, download_dir, file_extension)
-    except Exception:
-        logger.exception(f"Failed to download video {video.file_id}")
-        return None
+    return await _download_media(bot, message.video, "videos")
 
 
 async def download_voice_from_message(message: Message, bot: Bot) -> Optional[Path]:
@@ -364,24 +583,8 @@ async def download_voice_from_message(message: Message, bot: Bot) -> Optional[Pa
     """
     if not message.voice:
         return None
-
-    download_dir = DATA_DIR / "downloads" / "voice"
-    voice: Voice = message.voice
-
-    try:
-        file_obj = await bot.get_file(voice.file_id)
-
-        # Voice messages are typically .ogg files
-        file_extension = '.ogg'
-        if voice.mime_type:
-            ext = mimetypes.guess_extension(voice.mime_type)
-            if ext:
-                file_extension = ext
-
-        return await download_telegram_file(bot, file_obj, download_dir, file_extension)
-    except Exception:
-        logger.exception(f"Failed to download voice {voice.file_id}")
-        return None
+    # Voice messages are typically .ogg files
+    return await _download_media(bot, message.voice, "voice", default_extension=".ogg")
 
 
 async def download_video_note_from_message(message: Message, bot: Bot) -> Optional[Path]:
@@ -397,20 +600,20 @@ async def download_video_note_from_message(message: Message, bot: Bot) -> Option
     """
     if not message.video_note:
         return None
+    # Video notes are typically .mp4 files
+    return await _download_media(bot, message.video_note, "video_notes", default_extension=".mp4")
 
-    download_dir = DATA_DIR / "downloads" / "video_notes"
-    video_note: VideoNote = message.video_note
 
-    try:
-        file_obj = await bot.get_file(video_note.file_id)
-
-        # Video notes are typically .mp4 files
-        file_extension = '.mp4'
-
-        return await download_telegram_file(bot, file_obj, download_dir, file_extension)
-    except Exception:
-        logger.exception(f"Failed to download video note {video_note.file_id}")
-        return None
+# 扩展名（大写、不含点）-> 媒体类型，包括以文件形式发送的视频/音频/图片
+_EXT_TO_MEDIA_TYPE: Dict[str, str] = {
+    **dict.fromkeys(
+        ("MP4", "AVI", "MOV", "WMV", "FLV", "MKV", "WEBM", "MPEG", "M4V", "3GP", "OGV"), "videos"
+    ),
+    **dict.fromkeys(
+        ("MP3", "WAV", "OGG", "M4A", "AAC", "FLAC", "WMA", "AMR", "MPGA", "OPUS"), "audio"
+    ),
+    **dict.fromkeys(("JPG", "JPEG", "PNG", "WEBP", "BMP", "TIFF", "GIF", "SVG"), "photos"),
+}
 
 
 def _classify_file_by_extension(file_path: Path) -> str:
@@ -426,34 +629,24 @@ def _classify_file_by_extension(file_path: Path) -> str:
     if not file_path:
         return "documents"
 
-    file_extension = file_path.suffix.upper().lstrip(".")
+    # Unknown extensions remain as documents
+    return _EXT_TO_MEDIA_TYPE.get(file_path.suffix.upper().lstrip("."), "documents")
 
-    # Video files (including those sent as documents)
-    if file_extension in [
-        "MP4",
-        "AVI",
-        "MOV",
-        "WMV",
-        "FLV",
-        "MKV",
-        "WEBM",
-        "MPEG",
-        "M4V",
-        "3GP",
-        "OGV",
-    ]:
-        return "videos"
 
-    # Audio files (including those sent as documents)
-    if file_extension in ["MP3", "WAV", "OGG", "M4A", "AAC", "FLAC", "WMA", "AMR", "MPGA", "OPUS"]:
-        return "audio"
+def _new_media_dict() -> Dict[str, List[Path]]:
+    """按 MEDIA_TYPES 构造空的 media_files，每次返回新对象，调用方可原地追加"""
+    return {media_type: [] for media_type in MEDIA_TYPES}
 
-    # Image files (rare but possible as documents)
-    if file_extension in ["JPG", "JPEG", "PNG", "WEBP", "BMP", "TIFF", "GIF", "SVG"]:
-        return "photos"
 
-    # Everything else remains as document
-    return "documents"
+# (媒体类型, Message 属性名, 下载函数)；新增媒体类型只需在此登记
+_MEDIA_DOWNLOADERS = (
+    ("photos", "photo", _download_photos_from_message),
+    ("documents", "document", download_document_from_message),
+    ("audio", "audio", download_audio_from_message),
+    ("videos", "video", download_video_from_message),
+    ("voice", "voice", download_voice_from_message),
+    ("video_notes", "video_note", download_video_note_from_message),
+)
 
 
 async def download_all_media_from_message(message: Message, bot: Bot) -> Dict[str, List[Path]]:
@@ -467,53 +660,35 @@ async def download_all_media_from_message(message: Message, bot: Bot) -> Dict[st
     Returns:
         Dictionary with media type as key and list of paths as value
     """
-    media_files = {
-        "photos": [],
-        "documents": [],
-        "audio": [],
-        "videos": [],
-        "voice": [],
-        "video_notes": [],
-    }
-
-    # Download photo
-    if message.photo:
-        photo_paths = await _download_photos_from_message(message, bot)
-        if photo_paths:
-            media_files["photos"].extend(photo_paths)
-
-    # Download document (with smart reclassification)
-    if message.document:
-        doc_path = await download_document_from_message(message, bot)
-        if doc_path:
+    media_files = _new_media_dict()
+
+    # 各媒体类型互不依赖，并发下载：耗时由 Σlatency 降为 max(latency)
+    tasks = [
+        (media_type, downloader(message, bot))
+        for media_type, attr, downloader in _MEDIA_DOWNLOADERS
+        if getattr(message, attr)
+    ]
+    if not tasks:
+        return media_files
+
+    results = await asyncio.gather(*[coro for _, coro in tasks], return_exceptions=True)
+
+    for (media_type, _), result in zip(tasks, results):
+        if isinstance(result, Exception):
+            logger.error(f"Failed to download {media_type} from message: {result}")
+            continue
+        if not result:
+            continue
+
+        if media_type == "photos":
+            media_files["photos"].extend(result)
+        elif media_type == "documents":
             # Classify based on file extension to handle videos/audio sent as documents
-            classified_type = _classify_file_by_extension(doc_path)
-            media_files[classified_type].append(doc_path)
-            logger.debug(f"Document {doc_path.name} reclassified as {classified_type}")
-
-    # Download audio
-    if message.audio:
-        audio_path = await download_audio_from_message(message, bot)
-        if audio_path:
-            media_files["audio"].append(audio_path)
-
-    # Download video
-    if message.video:
-        video_path = await download_video_from_message(message, bot)
-        if video_path:
-            media_files["videos"].append(video_path)
-
-    # Download voice
-    if message.voice:
-        voice_path = await download_voice_from_message(message, bot)
-        if voice_path:
-            media_files["voice"].append(voice_path)
-
-    # Download video note
-    if message.video_note:
-        video_note_path = await download_video_note_from_message(message, bot)
-        if video_note_path:
-            media_files["video_notes"].append(video_note_path)
+            classified_type = _classify_file_by_extension(result)
+            media_files[classified_type].append(result)
+            logger.debug("Document {} reclassified as {}", result.name, classified_type)
+        else:
+            media_files[media_type].append(result)
 
     return media_files
 
@@ -535,29 +710,29 @@ async def download_media_group_files(trigger_message: Message, bot: Bot) -> Dict
     # Log media group info for debugging
     if len(group_messages) > 1:
         logger.info(f"Processing media group with {len(group_messages)} messages")
-        for idx, msg in enumerate(group_messages):
-            if msg.photo:
-                largest_photo = msg.photo[-1]
-                logger.debug(
-                    f"Message {idx+1}: message_id={msg.message_id}, "
-                    f"photo_file_id={largest_photo.file_id[:20]}..., "
-                    f"file_unique_id={largest_photo.file_unique_id}, "
-                    f"file_size={largest_photo.file_size}"
-                )
+        # 逐条明细只在 DEBUG 级别启用时才生成
+        logger.opt(lazy=True).debug(
+            "Media group photos:\n{}",
+            lambda: "\n".join(
+                f"Message {idx+1}: message_id={msg.message_id}, "
+                f"photo_file_id={msg.photo[-1].file_id[:20]}..., "
+                f"file_unique_id={msg.photo[-1].file_unique_id}, "
+                f"file_size={msg.photo[-1].file_size}"
+                for idx, msg in enumerate(group_messages)
+                if msg.photo
+            ),
+        )
 
     # Aggregate all media files
-    aggregated_media_files = {
-        "photos": [],
-        "documents": [],
-        "audio": [],
-        "videos": [],
-        "voice": [],
-        "video_notes": [],
-    }
-
-    for message in group_messages:
-        message_media = await download_all_media_from_message(message, bot)
+    aggregated_media_files = _new_media_dict()
 
+    # 组内各消息并发下载，每条消息的 get_file 与文件下载在各自协程内流水执行，
+    # 总耗时由各消息耗时之和降为最慢的一条；gather 保持结果顺序与 message_id 顺序一致
+    results = await asyncio.gather(
+        *[download_all_media_from_message(message, bot) for message in group_messages]
+    )
+
+    for message_media in results:
         # Merge media files from each message
         for media_type, paths in message_media.items():
             if paths:
@@ -567,78 +742,97 @@ async def download_media_group_files(trigger_message: Message, bot: Bot) -> Dict
     total_files = sum(len(paths) for paths in aggregated_media_files.values())
     if total_files > 0:
         logger.info(f"Downloaded {total_files} files from media group/message")
-        for media_type, paths in aggregated_media_files.items():
-            if paths:
-                logger.debug(f"  {media_type}: {len(paths)} files")
+        logger.opt(lazy=True).debug(
+            "{}",
+            lambda: "\n".join(
+                f"  {media_type}: {len(paths)} files"
+                for media_type, paths in aggregated_media_files.items()
+                if paths
+            ),
+        )
 
     return aggregated_media_files
 
 
-def cleanup_old_photos(max_age_hours: int = 24) -> None:
+def _walk(dirpath: str):
     """
-    清理超过指定时间的下载图片文件
+    递归遍历目录下的所有文件，产出 (path, st_mtime, st_size)
 
-    Args:
-        max_age_hours: 文件最大保留时间（小时）
+    DirEntry 自带文件类型，stat 结果也会被缓存，每个文件只需一次 stat
     """
-    download_dir = DATA_DIR / "downloads" / "photos"
-    if not download_dir.exists():
-        return
-
-    current_time = time.time()
-    max_age_seconds = max_age_hours * 3600
+    with os.scandir(dirpath) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _walk(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                st = entry.stat(follow_symlinks=False)
+                yield entry.path, st.st_mtime, st.st_size
 
-    cleaned_count = 0
-    try:
-        for photo_file in download_dir.iterdir():
-            if photo_file.is_file():
-                file_age = current_time - photo_file.stat().st_mtime
-                if file_age > max_age_seconds:
-                    photo_file.unlink()
-                    cleaned_count += 1
-
-        if cleaned_count > 0:
-            logger.info(f"Cleaned up {cleaned_count} old photo files")
 
-    except Exception as e:
-        logger.error(f"Failed to cleanup old photos: {e}")
+# 下载子目录 -> 文件最大保留时间（小时），未列出的子目录（社交媒体平台）使用默认值
+CLEANUP_RULES: Dict[str, int] = {media_type: 24 for media_type in MEDIA_DOWNLOAD_DIRS}
+SOCIAL_DOWNLOADS_MAX_AGE_HOURS = 48
 
 
-def cleanup_old_media(max_age_hours: int = 24) -> None:
+def cleanup_downloads(
+    rules: Dict[str, Optional[int]], default_max_age_hours: Optional[int] = None
+) -> None:
     """
-    Clean up old downloaded media files (all types)
+    单次遍历下载目录，按子目录规则清理过期文件
+
+    每个子目录只遍历一次；清理后变空、且自身已过期的内容目录（如社交媒体的帖子目录）会被删除
 
     Args:
-        max_age_hours: Maximum age in hours before deletion
+        rules: 子目录名 -> 最大保留时间（小时），值为 None 表示跳过该子目录
+        default_max_age_hours: 未在 rules 中列出的子目录的保留时间，None 表示跳过
     """
-    download_dir = DATA_DIR / "downloads"
-    if not download_dir.exists():
+    if not DOWNLOAD_DIR.exists():
         return
 
     current_time = time.time()
-    max_age_seconds = max_age_hours * 3600
 
     total_cleaned = 0
     total_size = 0
 
     try:
-        # Clean all subdirectories
-        for subdir in download_dir.iterdir():
-            if not subdir.is_dir():
+        with os.scandir(DOWNLOAD_DIR) as subdirs:
+            subdirs = [d for d in subdirs if d.is_dir(follow_symlinks=False)]
+
+        for subdir in subdirs:
+            max_age_hours = rules.get(subdir.name, default_max_age_hours)
+            if max_age_hours is None:
                 continue
+            # 每个子目录只计算一次截止时间，逐文件只需比较 mtime
+            cutoff = current_time - max_age_hours * 3600
+
+            # 删除文件会刷新所在目录的 mtime，因此在清理文件前记录已过期的内容目录；
+            # 下载器刚创建、还在等待网络写入文件的目录 mtime 较新，不会被删除
+            with os.scandir(subdir.path) as content_dirs:
+                content_dirs = [
+                    d.path
+                    for d in content_dirs
+                    if d.is_dir(follow_symlinks=False)
+                    and d.stat(follow_symlinks=False).st_mtime < cutoff
+                ]
 
             cleaned_count = 0
             cleaned_size = 0
 
-            for file_path in subdir.rglob("*"):
-                if file_path.is_file():
-                    file_age = current_time - file_path.stat().st_mtime
-                    if file_age > max_age_seconds:
-                        file_size = file_path.stat().st_size
-                        with suppress(Exception):
-                            file_path.unlink()
-                            cleaned_count += 1
-                            cleaned_size += file_size
+            for file_path, mtime, file_size in _walk(subdir.path):
+                if mtime >= cutoff:
+                    continue
+                try:
+                    os.unlink(file_path)
+                    cleaned_count += 1
+                    cleaned_size += file_size
+                except OSError as file_error:
+                    logger.warning(f"Failed to delete file {file_path}: {file_error}")
+
+            # 删除清理后变空的过期内容目录；rmdir 只会删除空目录，非空时抛出 OSError
+            for content_dir in content_dirs:
+                with suppress(OSError):
+                    os.rmdir(content_dir)
+                    logger.debug(f"Removed empty directory: {content_dir}")
 
             if cleaned_count > 0:
                 logger.info(
@@ -654,90 +848,65 @@ def cleanup_old_media(max_age_hours: int = 24) -> None:
             )
 
     except Exception:
-        logger.exception("Failed to cleanup old media files")
+        logger.exception("Failed to cleanup old downloads")
 
 
-def cleanup_old_social_downloads(max_age_hours: int = 48) -> None:
+def cleanup_old_photos(max_age_hours: int = 24) -> None:
     """
-    清理超过指定时间的社交媒体下载文件
+    清理超过指定时间的下载图片文件
 
     Args:
         max_age_hours: 文件最大保留时间（小时）
     """
-    social_downloads_dir = DATA_DIR / "downloads"
-    if not social_downloads_dir.exists():
-        return
+    cleanup_downloads({"photos": max_age_hours})
 
-    current_time = time.time()
-    max_age_seconds = max_age_hours * 3600
 
-    total_cleaned_count = 0
-    total_cleaned_size = 0
+def cleanup_old_media(max_age_hours: int = 24) -> None:
+    """
+    Clean up old downloaded media files (all types)
 
-    try:
-        # 遍历所有平台目录（除了 photos）
-        for platform_dir in social_downloads_dir.iterdir():
-            if not platform_dir.is_dir() or platform_dir.name == "photos":
-                continue
+    Args:
+        max_age_hours: Maximum age in hours before deletion
+    """
+    cleanup_downloads({}, default_max_age_hours=max_age_hours)
 
-            platform_cleaned_count = 0
-            platform_cleaned_size = 0
 
-            # 遍历平台下的所有内容目录
-            for content_dir in platform_dir.iterdir():
-                if not content_dir.is_dir():
-                    continue
+def cleanup_old_social_downloads(max_age_hours: int = SOCIAL_DOWNLOADS_MAX_AGE_HOURS) -> None:
+    """
+    清理超过指定时间的社交媒体下载文件
 
-                # 检查目录中的文件
-                files_to_clean = []
-                for file_path in content_dir.iterdir():
-                    if file_path.is_file():
-                        file_age = current_time - file_path.stat().st_mtime
-                        if file_age > max_age_seconds:
-                            files_to_clean.append(file_path)
-
-                # 删除过期文件
-                for file_path in files_to_clean:
-                    try:
-                        file_size = file_path.stat().st_size
-                        file_path.unlink()
-                        platform_cleaned_count += 1
-                        platform_cleaned_size += file_size
-                    except Exception as file_error:
-                        logger.warning(f"Failed to delete file {file_path}: {file_error}")
-
-                # 如果目录为空，删除目录
-                try:
-                    if not any(content_dir.iterdir()):
-                        content_dir.rmdir()
-                        logger.debug(f"Removed empty directory: {content_dir}")
-                except Exception as dir_error:
-                    logger.debug(f"Failed to remove directory {content_dir}: {dir_error}")
-
-            # 记录平台清理统计
-            if platform_cleaned_count > 0:
-                platform_cleaned_size_mb = platform_cleaned_size / (1024 * 1024)
-                logger.info(
-                    f"Cleaned up {platform_cleaned_count} old {platform_dir.name} files "
-                    f"({platform_cleaned_size_mb:.2f}MB)"
-                )
+    Args:
+        max_age_hours: 文件最大保留时间（小时）
+    """
+    cleanup_downloads(
+        {media_type: None for media_type in MEDIA_DOWNLOAD_DIRS},
+        default_max_age_hours=max_age_hours,
+    )
 
-            total_cleaned_count += platform_cleaned_count
-            total_cleaned_size += platform_cleaned_size
 
-        # 总体统计
-        if total_cleaned_count > 0:
-            total_cleaned_size_mb = total_cleaned_size / (1024 * 1024)
-            logger.info(
-                f"Total cleanup: {total_cleaned_count} files "
-                f"({total_cleaned_size_mb:.2f}MB) from all platforms"
-            )
+def _cleanup_downloads() -> None:
+    cleanup_downloads(CLEANUP_RULES, default_max_age_hours=SOCIAL_DOWNLOADS_MAX_AGE_HOURS)
 
-    except Exception as e:
-        logger.error(f"Failed to cleanup old social media downloads: {e}")
 
+def schedule_downloads_cleanup() -> None:
+    """
+    在后台线程中清理过期的下载文件，至多每 CLEANUP_INTERVAL 秒执行一次
+
+    需要在事件循环中调用，调用本身不会阻塞
+    """
+    global _last_cleanup, _cleanup_task
 
-hello_replies: List[str] = [
+    now = time.monotonic()
+    if now - _last_cleanup < CLEANUP_INTERVAL:
+        return
+    if _cleanup_task and not _cleanup_task.done():
+        return
+
+    _last_cleanup = now
+    _cleanup_task = asyncio.create_task(asyncio.to_thread(_cleanup_downloads))
+
+
+hello_replies: Tuple[str, ...] = (
     "Hey! 👋 Welcome—I'm here to help. 😊\nWhat can I do for you today? Whether it’s a question, an idea, or you just want to chat, I’m all ears! 💬❤️‍🔥",
     "Hi there!",
     "Hey! 👋",
@@ -769,10 +938,10 @@ hello_replies: List[str] = [
     "Hello sunshine! ☀️",
     "Hellow~ 🎵",
     "Hey! Nice to meet you! 🤝",
-]
+)
 
 
-image_mention_prompts: List[str] = [
+image_mention_prompts: Tuple[str, ...] = (
     "我看到你发了张图片并提到了我！🖼️ 请告诉我你想要我做什么：\n✨ 翻译图片中的文字？\n🔍 分析图片内容？\n💬 或者其他什么？",
     "嗨！👋 我看到你的图片了！请告诉我你的具体需求：\n📝 需要翻译图片中的文字吗？\n🤔 还是想了解图片的内容？\n请明确说明你的问题！",
     "你好！我注意到你发了张图片 📸\n请告诉我你希望我帮你做什么：\n🌐 翻译图片中的文字？\n📋 描述图片内容？\n💡 或者其他什么需求？",
@@ -783,15 +952,26 @@ image_mention_prompts: List[str] = [
     "嗨！我注意到你的图片了 🖼️\n请明确告诉我你想要：\n🌐 翻译图片中的文字？\n📋 描述图片内容？\n💡 或者其他什么帮助？",
     "你好！看到你提到了我并发了张图片 📷\n请告诉我你的需求：\n🈯 翻译图片中的文字？\n🔍 分析图片内容？\n✨ 请明确说明你的问题！",
     "Hi! 我看到你的图片了！🎨\n请告诉我你想要什么帮助：\n📖 翻译图片中的文字？\n📊 分析图片内容？\n💬 或者其他什么需求？",
-]
+)
+
+
+# 每轮将候选回复整体打乱后依次弹出，用尽再重新打乱：一轮内不会重复，随机数开销按轮摊薄
+_hello_samples: deque = deque()
+_image_mention_samples: deque = deque()
+
+
+def _next_sample(samples: deque, population: Tuple[str, ...]) -> str:
+    if not samples:
+        samples.extend(random.sample(population, len(population)))
+    return samples.popleft()
 
 
 def get_hello_reply():
-    return random.choice(hello_replies)
+    return _next_sample(_hello_samples, hello_replies)
 
 
 def get_image_mention_prompt():
-    return random.choice(image_mention_prompts)
+    return _next_sample(_image_mention_samples, image_mention_prompts)
 
 
 async def process_message_media(
@@ -812,18 +992,21 @@ async def process_message_media(
         - has_media: Boolean indicating if any media was downloaded
         - photo_paths: List of photo paths for backward compatibility
     """
+    # 纯文本消息（最常见的情况）无需访问媒体组缓存与下载流程
+    if not message.media_group_id and not any(
+        getattr(message, attr) for _, attr, _ in _MEDIA_DOWNLOADERS
+    ):
+        return _new_media_dict(), False, []
+
     # Add message to media group cache and download all media files
     add_message_to_media_group_cache(message)
     media_files = await download_media_group_files(message, bot)
 
     # Check if any media was downloaded
-    has_media = False
-    if media_files:
-        for media_type, paths in media_files.items():
-            if paths:
-                has_media = True
-                logger.info(f"Downloaded {len(paths)} {media_type} for processing")
-                break
+    has_media = any(media_files.values())
+    if has_media:
+        downloaded = ", ".join(f"{len(paths)} {t}" for t, paths in media_files.items() if paths)
+        logger.info(f"Downloaded {downloaded} for processing")
 
     # For backward compatibility
     photo_paths = media_files.get("photos", []) if media_files else []
@@ -5,7 +5,6 @@
 @GitHub  : https://github.com/QIN2DIM
 @Desc    : Service for interacting with Dify LLM workflows.
 """
-import json
 from contextlib import suppress
 from pathlib import Path
 from typing import AsyncGenerator, Dict, Any, List, Optional
@@ -42,9 +41,7 @@ async def invoke_model_blocking(
 
     with suppress(Exception):
         if settings.ENABLE_TEST_MODE:
-            outputs_json = json.dumps(
-                result.data.outputs.model_dump(mode="json"), indent=2, ensure_ascii=False
-            )
+            outputs_json = result.data.outputs.model_dump_json(indent=2)
             logger.debug(f"LLM Result: \n{outputs_json}")
 
     return result_text
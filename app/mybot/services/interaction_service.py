@@ -5,6 +5,7 @@
 @GitHub  : https://github.com/QIN2DIM
 @Desc    : Service for handling pre-interaction logic.
 """
+import asyncio
 from contextlib import suppress
 from typing import Dict, List, Optional
 
@@ -19,6 +20,8 @@ from mybot.common import (
     get_image_mention_prompt,
     add_message_to_media_group_cache,
     download_media_group_files,
+    schedule_downloads_cleanup,
+    mention_token,
 )
 from settings import settings
 
@@ -321,25 +324,33 @@ def _extract_reply_info(message: Message) -> Optional[Dict]:
     return reply_info
 
 
+# 不同任务类型在开始处理时使用的表情回应，未列出的类型默认 🤔
+_TASK_REACTIONS: Dict[TaskType, str] = {TaskType.AUTO: "🤖"}
+
+
 def _is_mention_bot(message: Message, bot_username: str) -> bool:
     """
     检查消息是否提及了指定的机器人
     """
-    if message.text:
-        for entity in message.entities:
-            if entity.type == "mention":
-                mentioned_username = message.text[entity.offset + 1 : entity.offset + entity.length]
-                if mentioned_username == bot_username:
-                    return True
-
-    if message.caption:
-        for entity in message.caption_entities:
-            if entity.type == "mention":
-                mentioned_username = message.caption[
-                    entity.offset + 1 : entity.offset + entity.length
-                ]
-                if mentioned_username == bot_username:
-                    return True
+    # 先做一次子串预检，绝大多数未提及机器人的消息无需解析实体
+    token = mention_token(bot_username)
+    if token not in (message.text or "") and token not in (message.caption or ""):
+        return False
+
+    # 文本与图片说明的实体在同一个循环中检查；长度不符的 mention 直接跳过，
+    # 长度相同时用 startswith 在原位比较，无需切片出子串
+    token_length = len(token)
+    for text, entities in (
+        (message.text, message.entities),
+        (message.caption, message.caption_entities),
+    ):
+        if not text:
+            continue
+        for entity in entities:
+            if entity.type != "mention" or entity.length != token_length:
+                continue
+            if text.startswith(bot_username, entity.offset + 1):
+                return True
 
     return False
 
@@ -357,17 +368,19 @@ def _determine_task_type(
     if message.from_user.is_bot and message.from_user.username == bot.username:
         return None
 
+    mentioned = _is_mention_bot(message, bot.username)
+
     if message.reply_to_message:
         reply_user = message.reply_to_message.from_user
         if reply_user.is_bot and reply_user.username == bot.username:
             return TaskType.REPLAY
-        if _is_mention_bot(message, bot.username):
+        if mentioned:
             return TaskType.MENTION_WITH_REPLY
 
     if not is_auto_trigger and not message.entities and not message.caption_entities:
         return None
 
-    if _is_mention_bot(message, bot.username):
+    if mentioned:
         return TaskType.MENTION
 
     if is_auto_trigger and (message.text or message.photo or message.caption):
@@ -391,6 +404,9 @@ async def pre_interactivity(
     with suppress(Exception):
         storage_messages_dataset(chat.type, trigger_message)
 
+    # 长时间运行时定期清理过期的下载文件（启动时已清理一次）
+    schedule_downloads_cleanup()
+
     # Add message to media group cache for handling grouped messages
     add_message_to_media_group_cache(trigger_message)
 
@@ -407,9 +423,7 @@ async def pre_interactivity(
     logger.debug(f"{task_type=}")
 
     # React to the message to show it's being processed
-    reaction = "🤔"
-    if task_type == TaskType.AUTO:
-        reaction = "🤖"
+    reaction = _TASK_REACTIONS.get(task_type, "🤔")
 
     try:
         await context.bot.set_message_reaction(
@@ -420,9 +434,9 @@ async def pre_interactivity(
 
     # Handle special cases for MENTION task
     if task_type == TaskType.MENTION:
-        real_text = (trigger_message.text or trigger_message.caption or "").replace(
-            f"@{context.bot.username}", ""
-        )
+        text = trigger_message.text or trigger_message.caption or ""
+        token = mention_token(context.bot.username)
+        real_text = text.replace(token, "") if token in text else text
         if not real_text.strip() and not trigger_message.photo:
             await trigger_message.reply_text(get_hello_reply())
             return None
@@ -453,30 +467,24 @@ async def pre_interactivity(
     quote_info = _extract_quote_info(trigger_message)
 
     # Download all media files (including media group support)
-    media_files = await download_media_group_files(trigger_message, context.bot)
-
-    # Maintain backward compatibility with photo_paths
-    photo_paths = media_files.get("photos", []) if media_files else None
-
-    # 处理 MENTION_WITH_REPLY 模式下的回复消息媒体
+    # MENTION_WITH_REPLY 模式下同时并发下载回复消息中的媒体
     if task_type == TaskType.MENTION_WITH_REPLY and trigger_message.reply_to_message:
         # Also add reply message to cache in case it's part of a media group
         add_message_to_media_group_cache(trigger_message.reply_to_message)
-        reply_media_files = await download_media_group_files(
-            trigger_message.reply_to_message, context.bot
+        media_files, reply_media_files = await asyncio.gather(
+            download_media_group_files(trigger_message, context.bot),
+            download_media_group_files(trigger_message.reply_to_message, context.bot),
         )
-        if reply_media_files:
-            # Merge media files from reply
-            if not media_files:
-                media_files = reply_media_files
-            else:
-                for media_type, paths in reply_media_files.items():
-                    if paths:
-                        media_files[media_type].extend(paths)
-
-            # Update photo_paths for backward compatibility
-            if reply_media_files.get("photos"):
-                photo_paths = (photo_paths or []) + reply_media_files["photos"]
+
+        # Merge media files from reply
+        for media_type, paths in reply_media_files.items():
+            if paths:
+                media_files[media_type].extend(paths)
+    else:
+        media_files = await download_media_group_files(trigger_message, context.bot)
+
+    # Maintain backward compatibility with photo_paths
+    photo_paths = media_files.get("photos", []) if media_files else None
 
     # 创建增强的 Interaction 对象
     return Interaction(
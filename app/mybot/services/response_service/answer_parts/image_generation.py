@@ -6,8 +6,11 @@
 @Desc    :
 """
 
+from contextlib import suppress
+from os import urandom
 from pathlib import Path
 from typing import Dict, Any, Optional
+from urllib.parse import urlparse
 
 import httpx
 from loguru import logger
@@ -17,6 +20,10 @@ from telegram.ext import ContextTypes
 
 from settings import DATA_DIR
 
+# 生成图片的下载目录在导入时创建一次
+GENERATED_IMAGES_DIR = DATA_DIR / "generated_images"
+GENERATED_IMAGES_DIR.mkdir(parents=True, exist_ok=True)
+
 
 async def _handle_answer_parts_image_generation(
     context: ContextTypes.DEFAULT_TYPE,
@@ -38,32 +45,45 @@ async def _handle_answer_parts_image_generation(
     )
 
 
+# 生成图片的下载共用一个连接池，避免每张图片都重新建立 TCP/TLS 连接
+_image_client: httpx.AsyncClient | None = None
+
+
+def _get_image_client() -> httpx.AsyncClient:
+    global _image_client
+    if _image_client is None or _image_client.is_closed:
+        _image_client = httpx.AsyncClient(timeout=30.0)
+    return _image_client
+
+
+async def close_image_client():
+    """释放生成图片下载使用的连接池"""
+    global _image_client
+    if _image_client is not None:
+        await _image_client.aclose()
+        _image_client = None
+
+
 async def _download_image_from_url(url: str) -> Optional[Path]:
     """Download image from URL and save to temporary directory"""
     try:
-        # Create temp directory for generated images
-        temp_dir = DATA_DIR / "generated_images"
-        temp_dir.mkdir(exist_ok=True)
+        temp_dir = GENERATED_IMAGES_DIR
 
         # Extract filename from URL or generate a unique one
-        import uuid
-        from urllib.parse import urlparse
-
         parsed_url = urlparse(url)
         filename = Path(parsed_url.path).name
         if not filename or not filename.lower().endswith(('.jpg', '.jpeg', '.png', '.webp')):
-            filename = f"generated_{uuid.uuid4().hex[:8]}.jpg"
+            filename = f"generated_{urandom(4).hex()}.jpg"
 
         # Download the image
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(url)
-            response.raise_for_status()
+        response = await _get_image_client().get(url)
+        response.raise_for_status()
 
-            # Save to file
-            file_path = temp_dir / filename
-            file_path.write_bytes(response.content)
-            logger.info(f"Downloaded image from {url} to {file_path}")
-            return file_path
+        # Save to file
+        file_path = temp_dir / filename
+        file_path.write_bytes(response.content)
+        logger.info(f"Downloaded image from {url} to {file_path}")
+        return file_path
 
     except Exception as e:
         logger.error(f"Failed to download image from {url}: {e}")
@@ -87,7 +107,9 @@ async def _send_single_photo_with_caption(
             reply_to_message_id=reply_to_message_id,
             parse_mode=parse_mode,
         )
-        await context.bot.delete_message(chat_id=chat_id, message_id=delete_message_id)
+        # 图片已送达，占位消息删除失败不能再触发下一种 parse_mode 的重发
+        with suppress(Exception):
+            await context.bot.delete_message(chat_id=chat_id, message_id=delete_message_id)
     except Exception as e:
         if "Message caption is too long" in str(e):
             logger.warning(f"Caption too long, sending photo without caption: {e}")
@@ -120,7 +142,9 @@ async def _send_photo_group_with_caption(
         await context.bot.send_media_group(
             chat_id=chat_id, media=media_group, reply_to_message_id=reply_to_message_id
         )
-        await context.bot.delete_message(chat_id=chat_id, message_id=delete_message_id)
+        # 图片已送达，占位消息删除失败不能再触发下一种 parse_mode 的重发
+        with suppress(Exception):
+            await context.bot.delete_message(chat_id=chat_id, message_id=delete_message_id)
     except Exception as e:
         if "Message caption is too long" in str(e):
             logger.warning(f"Caption too long, sending media group without caption: {e}")
@@ -202,39 +202,39 @@ class XhsDownloader(BaseSocialParser[XhsNoteDetail]):
                 }
 
             # Download the file and get headers
-            async with httpx.AsyncClient(timeout=settings.XHS_CONNECTION_TIMEOUT) as client:
-                response = await client.get(download_url)
-                response.raise_for_status()
-
-                # Update file extension based on actual response headers if available
-                content_disposition = response.headers.get('content-disposition')
-                actual_extension = self._get_file_extension(
-                    post.type or "normal", content_disposition, download_url
-                )
-
-                # Update filename if extension changed
-                if actual_extension != file_extension:
-                    unique_filename = f"{index:03d}_{resource_id}.{actual_extension}"
-                    local_path = download_dir / unique_filename
-
-                # Write file to disk
-                local_path.write_bytes(response.content)
-
-                file_size = len(response.content)
-                file_size_mib = file_size / (1024 * 1024)
-                logger.info(
-                    f"Downloaded {self.platform_id} resource: {local_path} ({file_size_mib:.2f} MiB)"
-                )
+            # 复用解析器自身的连接池，绝对 URL 会覆盖 base_url
+            response = await self._client.get(download_url)
+            response.raise_for_status()
+
+            # Update file extension based on actual response headers if available
+            content_disposition = response.headers.get('content-disposition')
+            actual_extension = self._get_file_extension(
+                post.type or "normal", content_disposition, download_url
+            )
+
+            # Update filename if extension changed
+            if actual_extension != file_extension:
+                unique_filename = f"{index:03d}_{resource_id}.{actual_extension}"
+                local_path = download_dir / unique_filename
+
+            # Write file to disk
+            local_path.write_bytes(response.content)
+
+            file_size = len(response.content)
+            file_size_mib = file_size / (1024 * 1024)
+            logger.info(
+                f"Downloaded {self.platform_id} resource: {local_path} ({file_size_mib:.2f} MiB)"
+            )
 
-                return {
-                    "success": True,
-                    "url": download_url,
-                    "local_path": str(local_path),
-                    "file_size": file_size,
-                    "index": index,
-                    "error": None,
-                    "skipped": False,  # This was actually downloaded
-                }
+            return {
+                "success": True,
+                "url": download_url,
+                "local_path": str(local_path),
+                "file_size": file_size,
+                "index": index,
+                "error": None,
+                "skipped": False,  # This was actually downloaded
+            }
 
         except Exception as e:
             logger.error(f"Failed to download resource {download_url}: {e}")
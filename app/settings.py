@@ -1,6 +1,6 @@
 import sys
 from pathlib import Path
-from typing import Set, Any, Literal
+from typing import FrozenSet, Any, Literal
 from urllib.request import getproxies
 from uuid import uuid4
 
@@ -72,11 +72,19 @@ class Settings(BaseSettings):
         default="streaming", description="Response mode: `blocking` or `streaming`."
     )
 
-    whitelist: Set[int] = Field(
-        default_factory=set,
+    whitelist: FrozenSet[int] = Field(
+        default_factory=frozenset,
         description="After configuring TELEGRAM_CHAT_WHITELIST, IDs are cleaned into this list for easy use",
     )
 
+    DIFY_CONCURRENCY: int | None = Field(
+        default=None,
+        description="Optional cap on blocking workflow requests in flight to Dify at once. "
+        "When set, bursts beyond this wait their turn instead of piling up on the Dify server. "
+        "Unset (default) sends every request immediately; LLM calls can take minutes, "
+        "so a low cap would queue new messages behind them.",
+    )
+
     BOT_ANSWER_PARSE_MODE: Literal["HTML"] = Field(
         default="HTML",
         description="Constrains the model's output format, defaults to HTML, requiring the model to express rich text in HTML rather than Markdown.",
@@ -103,6 +111,24 @@ class Settings(BaseSettings):
         "The default value at the interface layer is 5 seconds, here we increase this value to support bot responses to some larger full-modal media groups, such as: documents and audio/video",
     )
 
+    HTTP_POOL_TIMEOUT: float = Field(
+        default=30,
+        description="How long (seconds) a Telegram API call may wait for a free connection in the pool. "
+        "PTB defaults to 1 second, which raises PoolTimeout when long media uploads occupy the pool during bursts.",
+    )
+
+    POLLING_TIMEOUT: int = Field(
+        default=50,
+        description="Long polling timeout (seconds) for getUpdates. Telegram holds the request open up to this long, "
+        "so fewer round-trips are needed while the bot is idle.",
+    )
+
+    DOWNLOAD_CONCURRENCY: int = Field(
+        default=8,
+        description="Maximum number of concurrent getFile calls and file transfers from Telegram. "
+        "Bursts of media beyond this wait their turn instead of piling up on the Bot API server.",
+    )
+
     ENABLE_DEV_MODE: bool = Field(
         default=False,
         description="""
@@ -121,6 +147,12 @@ class Settings(BaseSettings):
         """,
     )
 
+    ENABLE_MESSAGE_DATASET: bool = Field(
+        default=False,
+        description="Whether to dump every received message to `data/<chat_type>_messages/` as NDJSON. "
+        "Only used for collecting development datasets; keep it off in production.",
+    )
+
     DEV_MODE_MOCKED_TEMPLATE: str = Field(
         default="<b>in the dev mode!</b>",
         description="When development mode is enabled, this template will be returned as a reply.",
@@ -162,9 +194,9 @@ class Settings(BaseSettings):
     def model_post_init(self, context: Any, /) -> None:
         try:
             if not self.whitelist and self.TELEGRAM_CHAT_WHITELIST:
-                self.whitelist = {
+                self.whitelist = frozenset(
                     int(i.strip()) for i in filter(None, self.TELEGRAM_CHAT_WHITELIST.split(","))
-                }
+                )
         except Exception as err:
             logger.warning(f"Failed to parse TELEGRAM_CHAT_WHITELIST - {err}")
 
@@ -211,6 +243,11 @@ class Settings(BaseSettings):
             .connect_timeout(self.HTTP_REQUEST_TIMEOUT)
             .write_timeout(self.HTTP_REQUEST_TIMEOUT)
             .read_timeout(self.HTTP_REQUEST_TIMEOUT)
+            .pool_timeout(self.HTTP_POOL_TIMEOUT)
+            # getUpdates 使用独立的单连接池，长轮询不会与回复、下载争抢连接
+            .get_updates_connection_pool_size(1)
+            # 处理器均由 non_blocking_handler 派发为后台任务，更新之间无需按序等待
+            .concurrent_updates(True)
             # Note: local_mode needs to be used with a local Bot API server.
             # If you are not running a local server, set local_mode to False
             .base_url(f"{self.TELEGRAM_BOT_API_URL}/bot")
@@ -37,6 +37,7 @@ def init_log(**sink_channel):
     )
 
     # 配置 loguru 日志记录器
+    # enqueue=True：格式化与写入交给后台线程，避免在事件循环中执行同步磁盘 I/O
     logger.remove()
     logger.add(
         sink=sys.stdout,
@@ -45,6 +46,7 @@ def init_log(**sink_channel):
         format=stdout_format,
         diagnose=False,
         filter=timezone_filter,
+        enqueue=True,
     )
     if sink_channel.get("error"):
         logger.add(
@@ -55,6 +57,7 @@ def init_log(**sink_channel):
             encoding="utf8",
             diagnose=False,
             filter=timezone_filter,
+            enqueue=True,
         )
     if sink_channel.get("runtime"):
         logger.add(
@@ -65,6 +68,7 @@ def init_log(**sink_channel):
             encoding="utf8",
             diagnose=False,
             filter=timezone_filter,
+            enqueue=True,
         )
     if sink_channel.get("serialize"):
         logger.add(
@@ -75,5 +79,6 @@ def init_log(**sink_channel):
             diagnose=False,
             serialize=True,
             filter=timezone_filter,
+            enqueue=True,
         )
     return logger
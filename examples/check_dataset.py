@@ -11,10 +11,16 @@ from settings import DATA_DIR
 
 chat_types = set()
 chat_enum = {}
-for message_path in DATA_DIR.rglob("*.json"):
-    data = json.loads(message_path.read_text(encoding="utf-8"))
-    sender_chat = data.get("from", {})
-    chat_enum[sender_chat.get("id", "")] = sender_chat
+# 消息按天追加写入 `{chat_type}_messages/{YYYY-MM-DD}.ndjson`，每行一条
+for dataset_path in DATA_DIR.glob("*_messages/*.ndjson"):
+    chat_types.add(dataset_path.parent.name.removesuffix("_messages"))
+    with dataset_path.open(encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            sender_chat = data.get("from", {})
+            chat_enum[sender_chat.get("id", "")] = sender_chat
 
 print(chat_types)
 print(json.dumps(chat_enum, indent=2, ensure_ascii=False))
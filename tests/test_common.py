@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2025/8/20 10:40
+@Author  : QIN2DIM
+@GitHub  : https://github.com/QIN2DIM
+@Desc    : Tests for the Telegram file, download and cache helpers in mybot.common
+"""
+
+import asyncio
+import json
+import os
+import time
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from telegram import File
+
+from mybot import common
+
+
+@pytest.fixture(autouse=True)
+def isolated_caches():
+    """Give every test empty in-process caches."""
+    common._file_cache.clear()
+    yield
+    common._file_cache.clear()
+
+
+class TestGetTelegramFile:
+    """getFile results are cached and concurrent lookups are coalesced."""
+
+    async def test_concurrent_lookups_call_get_file_once(self):
+        bot = AsyncMock()
+
+        async def get_file(file_id):
+            await asyncio.sleep(0.01)
+            return File(file_id=file_id, file_unique_id="uid", file_path="photos/f.jpg")
+
+        bot.get_file.side_effect = get_file
+
+        results = await asyncio.gather(
+            *[common.get_telegram_file(bot, "fid") for _ in range(5)]
+        )
+
+        assert bot.get_file.await_count == 1
+        assert {r.file_unique_id for r in results} == {"uid"}
+        assert not common._inflight_file_lookups
+
+        # 之后的查询直接命中进程内缓存
+        await common.get_telegram_file(bot, "fid")
+        assert bot.get_file.await_count == 1
+
+    async def test_failed_lookup_is_not_cached(self):
+        bot = Mock()
+        bot.get_file = AsyncMock(side_effect=[RuntimeError("boom"), File("fid", "uid")])
+
+        with pytest.raises(RuntimeError):
+            await common.get_telegram_file(bot, "fid")
+        assert (await common.get_telegram_file(bot, "fid")).file_unique_id == "uid"
+        assert bot.get_file.await_count == 2
+
+
+class TestMessagesDataset:
+    """Dataset messages are appended as NDJSON and flushed on shutdown."""
+
+    async def test_close_flushes_queued_messages(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(common.settings, "ENABLE_MESSAGE_DATASET", True)
+        monkeypatch.setattr(common, "DATA_DIR", tmp_path)
+        common._dataset_dir.cache_clear()
+
+        for message_id in range(3):
+            message = Mock()
+            message.to_dict.return_value = {"message_id": message_id, "text": "你好"}
+            common.storage_messages_dataset("group", message)
+
+        await common.close_messages_dataset()
+        common._dataset_dir.cache_clear()
+
+        (dataset_path,) = (tmp_path / "group_messages").glob("*.ndjson")
+        lines = dataset_path.read_text(encoding="utf-8").splitlines()
+        assert [json.loads(line)["message_id"] for line in lines] == [0, 1, 2]
+        assert common._dataset_queue is None
+
+
+def _age(path, hours):
+    mtime = time.time() - hours * 3600
+    os.utime(path, (mtime, mtime))
+
+
+class TestCleanupDownloads:
+    """Retention rules: 24h for Telegram media, SOCIAL_DOWNLOADS_MAX_AGE_HOURS for social."""
+
+    @pytest.mark.parametrize(
+        "subdir, max_age_hours",
+        [
+            *[(media_type, 24) for media_type in common.MEDIA_TYPES],
+            ("xhs", common.SOCIAL_DOWNLOADS_MAX_AGE_HOURS),
+        ],
+    )
+    def test_rule(self, tmp_path, monkeypatch, subdir, max_age_hours):
+        monkeypatch.setattr(common, "DOWNLOAD_DIR", tmp_path)
+        root = tmp_path / subdir
+        root.mkdir()
+
+        expired_file = root / "expired.bin"
+        fresh_file = root / "fresh.bin"
+        for path in (expired_file, fresh_file):
+            path.write_bytes(b"x")
+        _age(expired_file, max_age_hours + 1)
+        _age(fresh_file, max_age_hours - 1)
+
+        # 下载器刚创建、尚未写入文件的目录
+        fresh_dir = root / "inflight"
+        fresh_dir.mkdir()
+        # 过期的内容目录，其中的文件也已过期
+        expired_dir = root / "old_post"
+        expired_dir.mkdir()
+        expired_dir_file = expired_dir / "a.jpg"
+        expired_dir_file.write_bytes(b"x")
+        _age(expired_dir_file, max_age_hours + 1)
+        _age(expired_dir, max_age_hours + 1)
+
+        common.cleanup_downloads(
+            common.CLEANUP_RULES, default_max_age_hours=common.SOCIAL_DOWNLOADS_MAX_AGE_HOURS
+        )
+
+        assert not expired_file.exists()
+        assert fresh_file.exists()
+        assert fresh_dir.is_dir()
+        assert not expired_dir.exists()
+
+
+class _FakeFile:
+    """A remote Telegram file whose download blocks until released."""
+
+    def __init__(self, file_unique_id="uid", fail=False):
+        self.file_id = f"id-{file_unique_id}"
+        self.file_unique_id = file_unique_id
+        self.file_path = "https://api.telegram.org/file/bot<token>/photos/f.jpg"
+        self.file_size = 3
+        self.fail = fail
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def download_as_bytearray(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.fail:
+            raise RuntimeError("connection reset")
+        return bytearray(b"abc")
+
+
+class TestDownloadTelegramFile:
+    """Downloads are written atomically and concurrent fetches of one file are shared."""
+
+    @pytest.fixture(autouse=True)
+    def clear_download_state(self):
+        common._downloaded_files.clear()
+        yield
+        common._downloaded_files.clear()
+        assert not common._inflight_downloads
+
+    async def test_concurrent_identical_downloads_fetch_once(self, tmp_path):
+        file_obj = _FakeFile()
+        tasks = [
+            asyncio.create_task(common.download_telegram_file(None, file_obj, tmp_path))
+            for _ in range(5)
+        ]
+        await asyncio.sleep(0.01)
+        file_obj.release.set()
+
+        results = await asyncio.gather(*tasks)
+
+        assert file_obj.calls == 1
+        assert set(results) == {tmp_path / "uid.jpg"}
+        assert [p.name for p in tmp_path.iterdir()] == ["uid.jpg"]
+        assert (tmp_path / "uid.jpg").read_bytes() == b"abc"
+
+    async def test_failed_fetch_leaves_no_partial_file(self, tmp_path):
+        file_obj = _FakeFile(fail=True)
+        file_obj.release.set()
+
+        assert await common.download_telegram_file(None, file_obj, tmp_path) is None
+        assert list(tmp_path.iterdir()) == []
+
+        # 失败不会被缓存，重试可以正常下载
+        file_obj.fail = False
+        local_path = await common.download_telegram_file(None, file_obj, tmp_path)
+        assert local_path.read_bytes() == b"abc"
+        assert file_obj.calls == 2
+
+    async def test_cancelling_one_waiter_keeps_shared_fetch(self, tmp_path):
+        file_obj = _FakeFile()
+        cancelled = asyncio.create_task(common.download_telegram_file(None, file_obj, tmp_path))
+        waiter = asyncio.create_task(common.download_telegram_file(None, file_obj, tmp_path))
+        await asyncio.sleep(0.01)
+
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        file_obj.release.set()
+
+        assert await waiter == tmp_path / "uid.jpg"
+        assert file_obj.calls == 1
+        assert (tmp_path / "uid.jpg").read_bytes() == b"abc"
+
+
+def _group_message(message_id, media_group_id="g1"):
+    message = Mock()
+    message.message_id = message_id
+    message.media_group_id = media_group_id
+    return message
+
+
+class TestMediaGroupCache:
+    """Media groups are deduplicated by message_id, returned in order and expire lazily."""
+
+    @pytest.fixture(autouse=True)
+    def clock(self, monkeypatch):
+        common._media_group_cache.clear()
+        common._media_group_expiry.clear()
+        common._media_group_seen.clear()
+        now = [1000.0]
+        monkeypatch.setattr(common.time, "monotonic", lambda: now[0])
+        yield now
+        common._media_group_cache.clear()
+        common._media_group_expiry.clear()
+        common._media_group_seen.clear()
+
+    def test_group_is_ordered_without_duplicates(self):
+        messages = {message_id: _group_message(message_id) for message_id in (12, 10, 11)}
+        for message_id in (12, 10, 11, 10, 12):
+            common.add_message_to_media_group_cache(messages[message_id])
+
+        trigger = _group_message(13)
+        group = common.get_media_group_messages(trigger)
+
+        assert [m.message_id for m in group] == [10, 11, 12, 13]
+        assert group[:3] == [messages[10], messages[11], messages[12]]
+        # 触发消息只在返回结果中补上，不写入缓存
+        assert list(common._media_group_cache["g1"]) == [12, 10, 11]
+
+    def test_single_message_is_returned_as_is(self):
+        message = _group_message(1, media_group_id=None)
+
+        assert common.get_media_group_messages(message) == [message]
+        assert not common._media_group_cache
+
+    def test_stale_groups_are_evicted(self, clock):
+        common.add_message_to_media_group_cache(_group_message(1, "old"))
+        clock[0] += common.MEDIA_GROUP_CACHE_TTL / 2
+        common.add_message_to_media_group_cache(_group_message(2, "active"))
+
+        # "old" 已超过 TTL，"active" 未超过
+        clock[0] += common.MEDIA_GROUP_CACHE_TTL / 2 + 1
+        common.add_message_to_media_group_cache(_group_message(3, "new"))
+
+        assert set(common._media_group_cache) == {"active", "new"}
+        old_group = common.get_media_group_messages(_group_message(9, "old"))
+        assert [m.message_id for m in old_group] == [9]
+
+    def test_rewritten_group_is_kept_alive(self, clock):
+        common.add_message_to_media_group_cache(_group_message(1, "g1"))
+        clock[0] += common.MEDIA_GROUP_CACHE_TTL - 1
+        common.add_message_to_media_group_cache(_group_message(2, "g1"))
+
+        # 堆中较早的过期记录已失效，不会清掉最近写入过的组
+        clock[0] += 2
+        common.add_message_to_media_group_cache(_group_message(3, "other"))
+
+        assert [m.message_id for m in common._media_group_cache["g1"].values()] == [1, 2]
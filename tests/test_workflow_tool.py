@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+@Time    : 2025/8/20 10:12
+@Author  : QIN2DIM
+@GitHub  : https://github.com/QIN2DIM
+@Desc    : Tests for in-flight coalescing of blocking Dify workflow requests
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from dify import workflow_tool
+
+
+@pytest.fixture
+def mock_client():
+    """Patch the shared Dify client with one whose run() blocks until released."""
+    release = asyncio.Event()
+    client = AsyncMock()
+
+    async def run(payload, with_files=None):
+        await release.wait()
+        return payload.user
+
+    client.run.side_effect = run
+    with patch.object(workflow_tool, "get_client", return_value=client):
+        yield client, release
+
+
+class TestInflightCoalescing:
+    """Concurrent identical requests share a run only when they come from the same user."""
+
+    async def test_same_user_same_request_shares_one_run(self, mock_client):
+        client, release = mock_client
+
+        tasks = [
+            asyncio.create_task(
+                workflow_tool.run_blocking_dify_workflow(
+                    message_context="hello", from_user="alice(1)", bot_username="bot"
+                )
+            )
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await asyncio.gather(*tasks) == ["alice(1)"] * 3
+        assert client.run.await_count == 1
+        assert not workflow_tool._inflight
+
+    async def test_different_users_are_not_coalesced(self, mock_client):
+        client, release = mock_client
+
+        tasks = [
+            asyncio.create_task(
+                workflow_tool.run_blocking_dify_workflow(
+                    message_context="hello", from_user=user, bot_username="bot"
+                )
+            )
+            for user in ("alice(1)", "bob(2)")
+        ]
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await asyncio.gather(*tasks) == ["alice(1)", "bob(2)"]
+        assert client.run.await_count == 2
+
+    def test_inflight_key_includes_user(self):
+        args = ("hello", "bot", None, None)
+        assert workflow_tool._inflight_key("alice(1)", *args) != workflow_tool._inflight_key(
+            "bob(2)", *args
+        )
+
+    def test_inflight_key_fields_do_not_collide(self):
+        assert workflow_tool._inflight_key("a|b", "hello", "c", None, None) != (
+            workflow_tool._inflight_key("a", "hello", "b|c", None, None)
+        )